@@ -0,0 +1,56 @@
+"""
+    Measure the time of discovering the test cases of a big data provider, it should grow linearly with the number of test cases.
+
+    $ python benchmark/discovery_benchmark.py [test case numbers...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ptest.test_filter import TestFilterGroup
+from ptest.test_finder import TestFinder
+from ptest.test_suite import TestSuite
+
+TEST_MODULE_TEMPLATE = """
+from ptest.decorator import TestClass, Test, BeforeMethod
+
+
+@TestClass()
+class DiscoveryBenchmark:
+    @BeforeMethod()
+    def before(self):
+        pass
+
+    @Test(data_provider=range(%s))
+    def test_data(self, data):
+        pass
+"""
+
+
+def benchmark(test_case_number: int, module_dir: str) -> float:
+    module_name = "discovery_benchmark_%s" % test_case_number
+    with open(os.path.join(module_dir, module_name + ".py"), mode="w") as f:
+        f.write(TEST_MODULE_TEMPLATE % test_case_number)
+
+    test_suite = TestSuite("DiscoveryBenchmark")
+    start_time = time.perf_counter()
+    TestFinder(module_name, TestFilterGroup(), test_suite).find_tests()
+    elapsed_time = time.perf_counter() - start_time
+    assert len(test_suite.test_cases) == test_case_number
+    return elapsed_time
+
+
+def main(test_case_numbers):
+    with tempfile.TemporaryDirectory() as module_dir:
+        sys.path.insert(0, module_dir)
+        print("%12s %12s %16s" % ("test cases", "seconds", "us / test case"))
+        for test_case_number in test_case_numbers:
+            elapsed_time = benchmark(test_case_number, module_dir)
+            print("%12s %12.2f %16.1f" % (test_case_number, elapsed_time, elapsed_time * 1000000 / test_case_number))
+
+
+if __name__ == "__main__":
+    main([int(number) for number in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,86 @@
+"""
+    Measure the memory (RSS) used by the test cases of a synthetic suite, before and after running it.
+
+    $ python benchmark/memory_benchmark.py [test case number]
+"""
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ptest import config
+from ptest.plogger import pconsole
+from ptest.test_executor import TestSuiteExecutor
+from ptest.test_filter import TestFilterGroup
+from ptest.test_finder import TestFinder
+from ptest.test_suite import TestSuite
+
+TEST_MODULE_TEMPLATE = """
+from ptest.decorator import TestClass, Test, BeforeMethod, AfterMethod
+
+
+@TestClass()
+class MemoryBenchmark:
+    @BeforeMethod()
+    def before(self):
+        pass
+
+    @Test(data_provider=range(%s))
+    def test_data(self, data):
+        pass
+
+    @AfterMethod()
+    def after(self):
+        pass
+"""
+
+
+def get_rss() -> float:
+    """
+        Get the current RSS (in MB) of this process.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except IOError:
+        pass
+    # the peak RSS is used if current RSS is not available, it is in bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / 1024.0 / 1024.0 if sys.platform == "darwin" else max_rss / 1024.0
+
+
+def main(test_case_number: int):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sys.path.insert(0, temp_dir)
+        with open(os.path.join(temp_dir, "memory_benchmark_tests.py"), mode="w") as f:
+            f.write(TEST_MODULE_TEMPLATE % test_case_number)
+        config._options.update({"temp": temp_dir, "disable_screenshot": True, "async_mode": False})
+
+        base_rss = get_rss()
+        test_suite = TestSuite("MemoryBenchmark")
+        TestFinder("memory_benchmark_tests", TestFilterGroup(), test_suite).find_tests()
+        test_suite.init()
+        found_rss = get_rss()
+
+        # the console output of test executors is discarded
+        start_time = time.perf_counter()
+        with open(os.devnull, mode="w") as pconsole.out:
+            TestSuiteExecutor(test_suite, 1).start_and_join()
+        pconsole.out = sys.stdout
+        run_time = time.perf_counter() - start_time
+        run_rss = get_rss()
+
+    print("test cases: %s, run in %.1fs" % (test_case_number, run_time))
+    print("%-12s %10s %18s" % ("", "RSS (MB)", "bytes / test case"))
+    print("%-12s %10.1f %18s" % ("baseline", base_rss, "-"))
+    print("%-12s %10.1f %18.0f" % ("discovered", found_rss, (found_rss - base_rss) * 1024 * 1024 / test_case_number))
+    print("%-12s %10.1f %18.0f" % ("finished", run_rss, (run_rss - base_rss) * 1024 * 1024 / test_case_number))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
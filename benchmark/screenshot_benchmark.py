@@ -0,0 +1,81 @@
+"""
+    Measure the time and the output size of encoding a synthetic desktop screenshot to png,
+    the original encoder is compared with the current one at different compression levels and downscale factors.
+
+    $ python benchmark/screenshot_benchmark.py [width] [height]
+"""
+import os
+import sys
+import time
+from io import BytesIO
+from struct import pack
+from zlib import compress, crc32
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ptest import screen_capturer
+from ptest.screen_capturer import MSS
+
+
+def legacy_save_img(data, width, height, output):
+    # the encoder before the scanlines were assembled in place
+    len_sl = width * 3
+    scanlines = b''.join(
+        [pack(b'>B', 0) + data[y * len_sl:y * len_sl + len_sl]
+         for y in range(height)])
+
+    magic = pack(b'>8B', 137, 80, 78, 71, 13, 10, 26, 10)
+
+    ihdr = [b'', b'IHDR', b'', b'']
+    ihdr[2] = pack(b'>2I5B', width, height, 8, 2, 0, 0, 0)
+    ihdr[3] = pack(b'>I', crc32(b''.join(ihdr[1:3])) & 0xffffffff)
+    ihdr[0] = pack(b'>I', len(ihdr[2]))
+
+    idat = [b'', b'IDAT', b'', b'']
+    idat[2] = compress(scanlines, 9)
+    idat[3] = pack(b'>I', crc32(b''.join(idat[1:3])) & 0xffffffff)
+    idat[0] = pack(b'>I', len(idat[2]))
+
+    iend = [b'', b'IEND', b'', b'']
+    iend[3] = pack(b'>I', crc32(iend[1]) & 0xffffffff)
+    iend[0] = pack(b'>I', len(iend[2]))
+
+    output.write(magic + b''.join(ihdr) + b''.join(idat) + b''.join(iend))
+
+
+def make_desktop_pixels(width: int, height: int) -> bytes:
+    # flat windows with some noisy areas (like text and pictures) in the middle of every row
+    noise_width = width // 4
+    rows = []
+    for y in range(height):
+        background = bytes(((y // 200) * 40 % 256, 120, 200)) * (width - noise_width)
+        noise = os.urandom(noise_width * 3) if y % 3 else bytes(noise_width * 3)
+        half = len(background) // 2 // 3 * 3
+        rows.append(background[:half] + noise + background[half:])
+    return b"".join(rows)
+
+
+def benchmark(encode) -> tuple:
+    output = BytesIO()
+    start_time = time.perf_counter()
+    encode(output)
+    return time.perf_counter() - start_time, len(output.getvalue())
+
+
+def main(width: int, height: int):
+    pixels = make_desktop_pixels(width, height)
+    cases = [("legacy, level 9", lambda output: legacy_save_img(pixels, width, height, output))]
+    for compression_level, downscale in [(9, 1), (6, 1), (1, 1), (1, 2)]:
+        cases.append(("level %s, downscale %s" % (compression_level, downscale),
+                      lambda output, level=compression_level, factor=downscale:
+                      MSS().save_img(pixels, width, height, output, compression_level=level, downscale=factor)))
+
+    print("screenshot: %sx%s, numpy: %s" % (width, height, "yes" if screen_capturer.numpy is not None else "no"))
+    print("%-24s %10s %10s" % ("encoder", "seconds", "KB"))
+    for name, encode in cases:
+        elapsed_time, size = benchmark(encode)
+        print("%-24s %10.3f %10.0f" % (name, elapsed_time, size / 1024.0))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3840, int(sys.argv[2]) if len(sys.argv) > 2 else 2160)
@@ -156,15 +156,47 @@ def _parse_options(option_args):
     parser.add_option("-g", "--include-groups", action="store", dest="include_groups", default=None, metavar="groups",
                       help="Select test cases to run by groups, separated by comma.")
     parser.add_option("-n", "--test-executor-number", action="store", dest="test_executor_number", metavar="int",
-                      default=1, help="Specify the number of test executors. Default value is 1.")
+                      default=1, help="Specify the number of test executors. Default value is 1. "
+                           "With -m(--merge-junit-xmls), it is the number of processes to scan the junit result xmls.")
+    parser.add_option("--executor-mode", action="store", dest="executor_mode", default="thread", metavar="mode",
+                      type="choice", choices=["thread", "process"],
+                      help="Specify the mode of test executors, thread or process. Default value is thread. "
+                           "In process mode, the test class run groups are distributed to -n(--test-executor-number) worker processes, "
+                           "and @BeforeSuite and @AfterSuite are run in main process.")
+
+    parser.add_option("--async-mode", action="store_true", dest="async_mode", default=False,
+                      help="Run the coroutine test fixtures as tasks on a shared event loop. "
+                           "The test executor is released while the coroutine is awaiting, "
+                           "so the coroutine tests in parallel test classes can be run concurrently in one thread.")
+    parser.add_option("--release-test-instances", action="store_true", dest="release_test_instances", default=False,
+                      help="Release the test class instances (and the attributes set on them by @BeforeXXX) "
+                           "as soon as the test case, test group or test class is finished, only the results are kept. "
+                           "It keeps the memory flat for long runs.")
+
+    # distributed
+    parser.add_option("--coordinator", action="store", dest="coordinator", default=None, metavar="address",
+                      help="Run as coordinator listening at the address ([host:]port). "
+                           "The coordinator finds the tests and hands out the test class run groups to the workers connected to it.")
+    parser.add_option("--local-workers", action="store", dest="local_workers", default=0, metavar="int",
+                      help="Specify the number of workers started on this machine by the coordinator (--coordinator). Default value is 0.")
+    parser.add_option("--worker", action="store", dest="worker", default=None, metavar="address",
+                      help="Run as worker connecting to the coordinator at the address (host:port).")
+    parser.add_option("--auth-key", action="store", dest="auth_key", default=None, metavar="key",
+                      help="Specify the authentication key between coordinator and workers. "
+                           "If it is not specified for coordinator, a random key will be generated.")
 
     # output
     parser.add_option("-o", "--output-dir", action="store", dest="output_dir", default="test-output", metavar="dir",
                       help="Specify the output dir (relative to workspace).")
     parser.add_option("-r", "--report-dir", action="store", dest="report_dir", default="html-report", metavar="dir",
                       help="Specify the html report dir (relative to output dir).")
+    parser.add_option("--live-report", action="store_true", dest="live_report", default=False,
+                      help="Update the html report during the run, the finished test classes can be browsed before the test suite is finished.")
     parser.add_option("-x", "--junit-xml", action="store", dest="junit_xml", default="junit-results.xml",
                       metavar="file", help="Specify the junit result xml path (relative to output dir).")
+    parser.add_option("--timings-file", action="store", dest="timings_file", default="test-timings.json", metavar="file",
+                      help="Specify the path of test timings file (relative to output dir). "
+                           "The elapsed time of test cases are saved to it, and the longest test cases will be run first in next run.")
 
     # miscellaneous
     parser.add_option("-l", "--listeners", action="store", dest="test_listeners", default=None, metavar="class",
@@ -173,12 +205,48 @@ def _parse_options(option_args):
                            "The listener path format is: package.module.class "
                            "NOTE: 1. ptest ONLY searches modules under --workspace, --python-paths and sys.path "
                            "2. The listener class must be thread safe if you set -n(--test-executor-number) greater than 1.")
+    parser.add_option("--async-listeners", action="store_true", dest="async_listeners", default=False,
+                      help="Notify the test listeners in a dedicated thread instead of the test executors. "
+                           "The finished test cases are delivered to on_test_cases_finish() of the test listeners in batches.")
+    parser.add_option("--listener-queue-size", action="store", dest="listener_queue_size", default=10000, metavar="int",
+                      help="Specify the max number of pending events of the test listeners (--async-listeners). Default value is 10000.")
+    parser.add_option("--listener-queue-policy", action="store", dest="listener_queue_policy", default="block", metavar="policy",
+                      type="choice", choices=["block", "drop"],
+                      help="Specify what to do when the queue of the test listeners (--async-listeners) is full, block or drop. "
+                           "Default value is block, the test executors wait for free space. "
+                           "If it is drop, the test class/group/case events are dropped.")
     parser.add_option("-v", "--verbose", action="store_true", dest="verbose", default=False,
                       help="Set ptest console to verbose mode.")
+    parser.add_option("--buffered-console", action="store_true", dest="buffered_console", default=False,
+                      help="Buffer the console output of each thread and write it in a dedicated thread in batches, "
+                           "so the test executors do not wait for each other on the console.")
     parser.add_option("--temp", action="store", dest="temp", default="ptest-temp", metavar="dir",
                       help="Specify the temp dir (relative to workspace).")
     parser.add_option("--disable-screenshot", action="store_true", dest="disable_screenshot", default=False,
                       help="Disable taking screenshot for preporter.")
+    parser.add_option("--screenshot-encoders", action="store", dest="screenshot_encoders", default=2, metavar="int",
+                      help="Specify the number of threads encoding the desktop screenshots to png in background. Default value is 2. "
+                           "If it is 0, the screenshots are encoded in the test executors.")
+    parser.add_option("--screenshot-queue-size", action="store", dest="screenshot_queue_size", default=8, metavar="int",
+                      help="Specify the max number of desktop screenshots waiting for encoding. Default value is 8. "
+                           "The test executors wait for free space when it is full.")
+    parser.add_option("--screenshot-compression-level", action="store", dest="screenshot_compression_level", default=9, metavar="int",
+                      type="choice", choices=[str(level) for level in range(10)],
+                      help="Specify the zlib compression level (0-9) of the desktop screenshots. Default value is 9. "
+                           "The lower level is faster but the screenshots are larger.")
+    parser.add_option("--screenshot-downscale", action="store", dest="screenshot_downscale", default=1, metavar="int",
+                      help="Downscale the desktop screenshots by the given factor, e.g. 2 means half width and half height. "
+                           "Default value is 1 (no downscaling). It is not supported on Mac.")
+    parser.add_option("--screenshot-interval", action="store", dest="screenshot_interval", default=1, metavar="seconds",
+                      help="Specify the interval (in seconds) in which the requests for desktop screenshot reuse the last one. "
+                           "Default value is 1. If it is 0, every request takes a new desktop screenshot.")
+    parser.add_option("--max-screenshots", action="store", dest="max_screenshots", default=0, metavar="int",
+                      help="Specify the max number of screenshots taken in a run, the others are skipped. "
+                           "Default value is 0 (unlimited). The remote workers (--worker) have their own limits.")
+    parser.add_option("--web-driver-screenshot-timeout", action="store", dest="web_driver_screenshot_timeout", default=30,
+                      metavar="seconds",
+                      help="Specify the timeout (in seconds) of taking the screenshots of web drivers, they are taken concurrently. "
+                           "Default value is 30. If it is 0, wait for them forever.")
 
     # tool
     parser.add_option("-m", "--merge-junit-xmls", action="store", dest="merge_junit_xmls", default=None, metavar="files",
@@ -195,17 +263,21 @@ def _parse_options(option_args):
     options, unknown_args = parser.parse_args(option_args)
 
     # only one of the main options can be specified
-    main_options = [options.test_targets, options.run_failed, options.merge_junit_xmls]
+    main_options = [options.test_targets, options.run_failed, options.merge_junit_xmls, options.worker]
     specified_options_count = len([option for option in main_options if option is not None])
     if specified_options_count == 0:
-        parser.error("You must specify one of the following options: -t(--targets), -R(--run-failed), -m(--merge-junit-xmls).")
+        parser.error("You must specify one of the following options: -t(--targets), -R(--run-failed), -m(--merge-junit-xmls), --worker.")
     elif specified_options_count > 1:
-        parser.error("You can ONLY specify one of the following options: -t(--targets), -R(--run-failed), -m(--merge-junit-xmls).")
+        parser.error("You can ONLY specify one of the following options: -t(--targets), -R(--run-failed), -m(--merge-junit-xmls), --worker.")
 
     # check '--to'
     if options.merge_junit_xmls is not None and options.to is None:
         parser.error("You must use --to to specify the path of merged junit result xml (--merge-junit-xmls).")
 
+    # check '--auth-key'
+    if options.worker is not None and options.auth_key is None:
+        parser.error("You must use --auth-key to specify the authentication key of coordinator (--worker).")
+
     # spilt multiple values by comma
     def split(option_value):
         return None if option_value is None else option_value.split(",")
@@ -230,6 +302,7 @@ def _parse_options(option_args):
     options.output_dir = join_path(options.workspace, options.output_dir)
     options.report_dir = join_path(options.output_dir, options.report_dir)
     options.junit_xml = join_path(options.output_dir, options.junit_xml)
+    options.timings_file = join_path(options.output_dir, options.timings_file)
     options.temp = join_path(options.workspace, options.temp)
 
     options.merge_junit_xmls = None if options.merge_junit_xmls is None else [join_path(options.workspace, path) for path in
@@ -140,6 +140,7 @@ def Test(enabled: bool = True,
          expected_exceptions: Union[Type[Exception], List[Type[Exception]], Tuple[Type[Exception], ...], Dict[Type[Exception], str]] = None,
          data_provider: Iterable = None,
          data_name: Callable[[int, Any], str] = None,
+         stream_data_provider: bool = False,
          group: str = "DEFAULT",
          description: str = "",
          timeout: int = 0,
@@ -172,6 +173,10 @@ def Test(enabled: bool = True,
             def test_something(self, name):
                 assert_that(name).is_not_none()
             The test names are test_something#foo and test_something#bar.
+    :param stream_data_provider: consume the data provider while running instead of before running.
+        The test cases are created just in time and only their results are kept after finished,
+        so the data provider can be a generator which yields a huge number of rows (e.g. from a csv file or a database cursor).
+        Note: If no data_provider specified, stream_data_provider will be ignored.
     :param group: the group that this test belongs to.
     :param description: the description of this test.
     :param timeout: the timeout of this test (in seconds).
@@ -236,9 +241,11 @@ def Test(enabled: bool = True,
         func.__data_index__ = None
         func.__data_provider__ = None
         func.__funcs__ = [func]
+        func.__stream_data_provider__ = False
         if data_provider is not None:
             func.__data_provider__ = data_provider
             func.__funcs__ = []
+            func.__stream_data_provider__ = stream_data_provider
             func.__data_name__ = data_name or (lambda index, params: index + 1)
             if len(inspect.signature(func.__data_name__).parameters) != 2:
                 raise TypeError("Data name function must be declared with 2 parameters.")
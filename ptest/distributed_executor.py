@@ -0,0 +1,264 @@
+import multiprocessing
+import os
+import sys
+import threading
+import traceback
+from collections import deque
+from multiprocessing.connection import Listener, Client
+
+from typing import List, Tuple
+
+from . import config
+from .plogger import pconsole, pconsole_err
+from .process_executor import get_before_suite_state, get_test_case_targets, run_test_class_run_group, notify_test_listeners, \
+    merge_test_class_result, fail_test_class_run_group
+from .screen_capturer import get_screenshot_counter, init_screenshot_counter
+from .test_executor import TestExecutor, TestSuiteExecutor
+from .test_suite import TestSuite, TestClass
+from .util import make_dirs
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class DistributedTestSuiteExecutor(TestSuiteExecutor):
+    """
+        Run the @BeforeSuite and @AfterSuite in current process (the coordinator),
+        and hand out the test class run groups to the workers connected to the coordinator.
+    """
+
+    def __init__(self, test_suite: TestSuite, workers: int, address: Tuple[str, int], auth_key: bytes, local_workers: int):
+        TestSuiteExecutor.__init__(self, test_suite, workers)
+        self.address = address
+        self.auth_key = auth_key
+        self.local_workers = local_workers
+
+    def _run_test_class_run_groups(self):
+        yield TestCoordinatorExecutor(self)
+
+
+class TestCoordinatorExecutor(TestExecutor):
+    # a test class run group is failed if its workers are lost for this many times
+    max_attempts = 3
+
+    def __init__(self, distributed_test_suite_executor: DistributedTestSuiteExecutor):
+        TestExecutor.__init__(self, distributed_test_suite_executor)
+        self.test_suite = distributed_test_suite_executor.test_suite
+        self.address = distributed_test_suite_executor.address
+        self.auth_key = distributed_test_suite_executor.auth_key
+        self.local_workers = distributed_test_suite_executor.local_workers
+        self.__pending_test_class_run_groups = deque(self.test_suite.test_class_run_groups)
+        self.__unfinished_count = len(self.__pending_test_class_run_groups)
+        self.__lost_counts = {}  # id of test class run group -> the times its workers are lost
+        self.__condition = threading.Condition()
+        self.__init_message = None
+
+    def _run(self):
+        if self.__unfinished_count == 0:
+            return
+
+        self.__init_message = {
+            "properties": config._properties,
+            "beforeSuiteStatus": self.test_suite.before_suite.status,
+            "beforeSuiteState": get_before_suite_state(self.test_suite)
+        }
+
+        listener = Listener(self.address, authkey=self.auth_key)
+        host, port = listener.address
+        pconsole.write_line("Coordinator is listening at %s:%s, waiting for workers..." % (host, port))
+
+        accept_thread = threading.Thread(target=self.__accept, args=(listener,))
+        accept_thread.daemon = True
+        accept_thread.start()
+
+        # start the workers on this machine
+        local_worker_address = ("127.0.0.1" if host in ("", "0.0.0.0") else host, port)
+        context = multiprocessing.get_context("spawn")
+        def start_local_worker():
+            process = context.Process(target=_run_local_worker, args=(sys.path, config._options, local_worker_address, self.auth_key,
+                                                                      get_screenshot_counter().counts))
+            process.daemon = True
+            process.start()
+            return process
+
+        local_worker_processes = [start_local_worker() for _ in range(self.local_workers)]
+
+        with self.__condition:
+            while self.__unfinished_count > 0:
+                self.__condition.wait(1)
+                # restart the local workers died (e.g. a test exits the process), the test class run groups are handed out again
+                for index, process in enumerate(local_worker_processes):
+                    if self.__unfinished_count > 0 and not process.is_alive():
+                        pconsole_err.write_line("Local worker exited with code %s, restarting it..." % process.exitcode)
+                        local_worker_processes[index] = start_local_worker()
+
+        # wake up the accept thread
+        try:
+            Client(listener.address, authkey=self.auth_key).close()
+        except Exception:
+            pass
+        accept_thread.join()
+        listener.close()
+        for process in local_worker_processes:
+            process.join()
+
+    def __accept(self, listener: Listener):
+        while True:
+            try:
+                connection = listener.accept()
+            except Exception:
+                with self.__condition:
+                    if self.__unfinished_count == 0:
+                        return
+                pconsole_err.write_line("Failed to accept worker:\n%s" % traceback.format_exc())
+                continue
+            with self.__condition:
+                if self.__unfinished_count == 0:
+                    connection.close()
+                    return
+            worker_thread = threading.Thread(target=self.__serve, args=(connection,))
+            worker_thread.daemon = True
+            worker_thread.start()
+
+    def __serve(self, connection):
+        try:
+            connection.send(self.__init_message)
+            while True:
+                test_class_run_group = self.__next_test_class_run_group()
+                if test_class_run_group is None:
+                    connection.send(None)
+                    return
+                test_class_names = [test_class.full_name for test_class in test_class_run_group]
+                test_case_names = get_test_case_targets(test_class_run_group)
+                try:
+                    connection.send((test_class_names, test_case_names))
+                    test_class_results, files, stack_trace = connection.recv()
+                except Exception:
+                    stack_trace = traceback.format_exc()
+                    pconsole_err.write_line("Lost connection to worker:\n%s" % stack_trace)
+                    with self.__condition:
+                        lost_count = self.__lost_counts.get(id(test_class_run_group), 0) + 1
+                        self.__lost_counts[id(test_class_run_group)] = lost_count
+                        if lost_count < self.max_attempts:
+                            # hand out this test class run group to another worker
+                            self.__pending_test_class_run_groups.appendleft(test_class_run_group)
+                            self.__condition.notify_all()
+                    if lost_count >= self.max_attempts:
+                        fail_test_class_run_group(test_class_run_group, "The workers were lost %s times while running this test."
+                                                  % lost_count, stack_trace)
+                        self.__finish_test_class_run_group(test_class_run_group)
+                    return
+                if stack_trace is not None:
+                    fail_test_class_run_group(test_class_run_group, "The worker failed to run this test.", stack_trace)
+                    self.__finish_test_class_run_group(test_class_run_group)
+                else:
+                    self.__merge_test_class_run_group_result(test_class_run_group, test_class_results, files)
+        except Exception:
+            pconsole_err.write_line("Failed to serve worker:\n%s" % traceback.format_exc())
+        finally:
+            connection.close()
+
+    def __next_test_class_run_group(self) -> List[TestClass]:
+        with self.__condition:
+            # wait for a pending test class run group, the running ones might be handed out again if their workers are lost
+            while not self.__pending_test_class_run_groups and self.__unfinished_count > 0:
+                self.__condition.wait()
+            if self.__pending_test_class_run_groups:
+                return self.__pending_test_class_run_groups.popleft()
+            return None
+
+    def __merge_test_class_run_group_result(self, test_class_run_group: List[TestClass], test_class_results: List[dict], files: dict):
+        try:
+            report_dir = config.get_option("report_dir")
+            for file_path, content in files.items():
+                # the images are named by their content, the existing ones are the same
+                file_full_path = os.path.join(report_dir, file_path)
+                if not os.path.exists(file_full_path):
+                    make_dirs(os.path.dirname(file_full_path))
+                    with open(file_full_path, mode="wb") as f:
+                        f.write(content)
+            for test_class_result in test_class_results:
+                merge_test_class_result(self.test_suite, test_class_result)
+        except Exception:
+            fail_test_class_run_group(test_class_run_group, "Failed to merge the result from worker.", traceback.format_exc())
+        self.__finish_test_class_run_group(test_class_run_group)
+
+    def __finish_test_class_run_group(self, test_class_run_group: List[TestClass]):
+        notify_test_listeners(test_class_run_group)
+        with self.__condition:
+            self.__unfinished_count -= 1
+            self.__condition.notify_all()
+
+
+def run_worker(address: Tuple[str, int], auth_key: bytes):
+    """
+        Connect to the coordinator and run the test class run groups handed out by it until there is nothing left.
+    """
+    temp_dir = config.get_option("temp")
+    make_dirs(temp_dir)
+
+    connection = Client(address, authkey=auth_key)
+    try:
+        init_message = connection.recv()
+        # the properties defined in worker's cmd line take precedence
+        properties = dict(init_message["properties"])
+        properties.update(config._properties)
+        config._properties.update(properties)
+        while True:
+            assignment = connection.recv()
+            if assignment is None:
+                return
+            test_class_names, test_case_names = assignment
+            pconsole.write_line("Running %s tests of %s..." % (len(test_case_names), ", ".join(test_class_names)))
+            try:
+                test_class_results = run_test_class_run_group(test_class_names, test_case_names, init_message["beforeSuiteStatus"],
+                                                              init_message["beforeSuiteState"], int(config.get_option("test_executor_number")))
+            except Exception:
+                # send the failure to coordinator instead of dying, so this test class run group is not handed out again
+                stack_trace = traceback.format_exc()
+                pconsole_err.write_line("Failed to run the tests:\n%s" % stack_trace)
+                connection.send((None, {}, stack_trace))
+            else:
+                connection.send((test_class_results, _collect_files(test_class_results, config.get_option("report_dir")), None))
+    except EOFError:
+        pconsole_err.write_line("Lost connection to coordinator.")
+    finally:
+        connection.close()
+
+
+def _run_local_worker(python_paths, options, address: Tuple[str, int], auth_key: bytes, screenshot_counts):
+    sys.path[:] = python_paths
+    config._options.update(options)
+    init_screenshot_counter(screenshot_counts)
+    from .main import hook_web_driver
+    hook_web_driver()
+    run_worker(address, auth_key)
+
+
+def _collect_files(test_class_results: List[dict], report_dir: str) -> dict:
+    # the screenshots and images are sent to coordinator, since the worker might be on another machine
+    files = {}
+
+    def collect(test_fixture_result):
+        for log in test_fixture_result.get("logs", []):
+            for image in log.get("screenshots", []) + log.get("images", []):
+                if "path" not in image or image["path"] in files:
+                    continue
+                file_path = os.path.join(report_dir, image["path"])
+                if os.path.isfile(file_path):
+                    with open(file_path, mode="rb") as f:
+                        files[image["path"]] = f.read()
+
+    for test_class_result in test_class_results:
+        collect(test_class_result["beforeClass"])
+        collect(test_class_result["afterClass"])
+        for test_group_result in test_class_result["testGroups"]:
+            collect(test_group_result["beforeGroup"])
+            collect(test_group_result["afterGroup"])
+            for test_case_result in test_group_result["testCases"]:
+                collect(test_case_result["beforeMethod"])
+                collect(test_case_result["test"])
+                collect(test_case_result["afterMethod"])
+    return files
@@ -566,17 +566,15 @@ $('.tree').on('click', 'li.parent.expanded>.item>.sign', function (e) {
 
 // add listener for clicking collapsed parent node
 $('.tree').on('click', 'li.parent.collapsed>.item>.sign', function (e) {
-  var node = $(this).parent().parent();
-  var children = node.find(' > ul > li');
-  children.show('fast');
-  $(this).text("-");
-  node.removeClass('collapsed').addClass('expanded');
+  expandNode($(this).parent().parent(), false);
   e.stopPropagation();
 });
 
 // add listener for expand all
 $('.navigation .toolbar .expand-all').on('click', function (e) {
-  $('.tree li.parent.collapsed>.item>.sign').click();
+  $('.tree>ul>li.parent').each(function () {
+    expandNode($(this), true);
+  });
   e.stopPropagation();
 });
 
@@ -588,22 +586,37 @@ $('.navigation .toolbar .collapse-all').on('click', function (e) {
 
 // add listener for selecting node
 $('.tree').on('click', 'li > .item', function (e) {
+  var item = $(this);
+  var data = item.parent().data("data");
+  $('.tree li .selected').removeClass('selected');
+  item.addClass('selected');
+  e.stopPropagation();
+
+  if (data.type === "class") {
+    // the detail of test class is in its shard
+    loadTestClass(data, function () {
+      if (item.hasClass('selected')) {
+        selectNode(data);
+      }
+    });
+  } else {
+    selectNode(data);
+  }
+});
+
+function selectNode(data) {
   var oldScrollTop = $(window).scrollTop();
   // render detail panel
-  renderDetailPanel($(this).parent().data("data"));
+  renderDetailPanel(data);
   // calculate margin top and min height of detail panel
   var detailPanelHeader = $('.detail>.panel-heading');
   var detailPanelBody = $('.detail>.panel-body');
   detailPanelBody.css("margin-top", detailPanelHeader.outerHeight() + 'px');
   detailPanelBody.css('min-height', $('.navigation').outerHeight() - detailPanelHeader.outerHeight() - 2 + 'px'); // minus the border of detail panel
 
-  $('.tree li .selected').removeClass('selected');
-  $(this).addClass('selected');
-  e.stopPropagation();
-
   var maxTop = 76;
   $(window).scrollTop(Math.min(oldScrollTop, maxTop));
-});
+}
 
 // calculate the "top" of navigation
 $(window).scroll(function () {
@@ -618,66 +631,145 @@ $(window).scroll(function () {
   }
 });
 
-function renderTreePanel(testSuite, statusFilter) {
-  function appendToNode(parentNode, data, visible, expanded) {
-    var node = null;
-    if (data.type === "case") {
-      if (statusFilter !== data.status && statusFilter !== "all") {
-        return null;
-      }
-      var nodeContent = '<li class="node leaf"><div class="item" title="{name}"><div class="sign {status}"></div><div class="name">{name}</div></div></li>';
-      // test case
-      node = $(nodeContent.format({
-        "name": data.name,
-        "status": data.status
-      }));
-    } else {
-      if (data[statusFilter] === 0 && statusFilter !== "all") {
-        return null;
-      }
-      // test container
-      var nodeContent = '<li class="node parent {expandClass}"><div class="item" title="{name}"><div class="sign" title="Click to expand/collapse.">{sign}</div><div class="name">{name}</div><div class="rate-container"><div class="passed rate" style="width: {passRate}%"></div><div class="failed rate" style="width: {failRate}%"></div><div class="skipped rate" style="width: {skipRate}%"></div></div><div class="type">{type}</div><div class="number">{total}</div></div><ul></ul></li>';
-      var nodeContentFormatter = {
-        "name": data.name,
-        "expandClass": expanded ? 'expanded' : 'collapsed',
-        "sign": expanded ? '-' : '+',
-        "type": data.type,
-        "total": 0,
-        "passRate": 0,
-        "failRate": 0,
-        "skipRate": 0
-      };
-      switch (statusFilter) {
-        case "passed":
-          nodeContentFormatter["total"] = data.passed;
-          nodeContentFormatter["passRate"] = 100;
-          break;
-        case "failed":
-          nodeContentFormatter["total"] = data.failed;
-          nodeContentFormatter["failRate"] = 100;
-          break;
-        case "skipped":
-          nodeContentFormatter["total"] = data.skipped;
-          nodeContentFormatter["skipRate"] = 100;
-          break;
-        case "all":
-          nodeContentFormatter["total"] = data.total;
-          nodeContentFormatter["passRate"] = data.passed * 100.0 / data.total;
-          nodeContentFormatter["failRate"] = data.failed * 100.0 / data.total;
-          nodeContentFormatter["skipRate"] = data.skipped * 100.0 / data.total;
+// the test classes are written to shards, the shard is loaded when the test class is expanded or selected
+var testClassShards = {};
+
+function loadTestClass(testClass, callback) {
+  if (testClass.loaded) {
+    callback();
+    return;
+  }
+  var shard = testClassShards[testClass.shard];
+  if (shard) {
+    shard.callbacks.push(callback);
+    return;
+  }
+  testClassShards[testClass.shard] = {"testClass": testClass, "callbacks": [callback]};
+  var script = document.createElement('script');
+  script.type = 'text/javascript';
+  script.src = testClass.shard;
+  document.body.appendChild(script);
+}
+
+// called by the shard of test class
+function onTestClassLoaded(shardPath, testClassDetail) {
+  var shard = testClassShards[shardPath];
+  $.extend(shard.testClass, testClassDetail);
+  shard.testClass.loaded = true;
+  for (var i = 0; i < shard.callbacks.length; i++) {
+    shard.callbacks[i]();
+  }
+  shard.callbacks = [];
+}
+
+function expandNode(node, recursive) {
+  function expand() {
+    if (node.hasClass('collapsed')) {
+      node.find(' > ul > li').show('fast');
+      node.find(' > .item > .sign').text("-");
+      node.removeClass('collapsed').addClass('expanded');
+    }
+    if (recursive) {
+      node.find(' > ul > li.parent').each(function () {
+        expandNode($(this), true);
+      });
+    }
+  }
+
+  var data = node.data("data");
+  if (data.type === "class" && !node.data("rendered")) {
+    loadTestClass(data, function () {
+      if (!node.data("rendered")) {
+        renderTestClassChildren(node, data, $('.navigation .filter-btn.selected').attr('filter'));
+        node.data("rendered", true);
+      }
+      expand();
+    });
+  } else {
+    expand();
+  }
+}
+
+function appendToNode(parentNode, data, statusFilter, visible, expanded) {
+  var node = null;
+  if (data.type === "case") {
+    if (statusFilter !== data.status && statusFilter !== "all") {
+      return null;
+    }
+    var nodeContent = '<li class="node leaf"><div class="item" title="{name}"><div class="sign {status}"></div><div class="name">{name}</div></div></li>';
+    // test case
+    node = $(nodeContent.format({
+      "name": data.name,
+      "status": data.status
+    }));
+  } else {
+    if (data[statusFilter] === 0 && statusFilter !== "all") {
+      return null;
+    }
+    // test container
+    var nodeContent = '<li class="node parent {expandClass}"><div class="item" title="{name}"><div class="sign" title="Click to expand/collapse.">{sign}</div><div class="name">{name}</div><div class="rate-container"><div class="passed rate" style="width: {passRate}%"></div><div class="failed rate" style="width: {failRate}%"></div><div class="skipped rate" style="width: {skipRate}%"></div></div><div class="type">{type}</div><div class="number">{total}</div></div><ul></ul></li>';
+    var nodeContentFormatter = {
+      "name": data.name,
+      "expandClass": expanded ? 'expanded' : 'collapsed',
+      "sign": expanded ? '-' : '+',
+      "type": data.type,
+      "total": 0,
+      "passRate": 0,
+      "failRate": 0,
+      "skipRate": 0
+    };
+    switch (statusFilter) {
+      case "passed":
+        nodeContentFormatter["total"] = data.passed;
+        nodeContentFormatter["passRate"] = 100;
+        break;
+      case "failed":
+        nodeContentFormatter["total"] = data.failed;
+        nodeContentFormatter["failRate"] = 100;
+        break;
+      case "skipped":
+        nodeContentFormatter["total"] = data.skipped;
+        nodeContentFormatter["skipRate"] = 100;
+        break;
+      case "all":
+        nodeContentFormatter["total"] = data.total;
+        nodeContentFormatter["passRate"] = data.passed * 100.0 / data.total;
+        nodeContentFormatter["failRate"] = data.failed * 100.0 / data.total;
+        nodeContentFormatter["skipRate"] = data.skipped * 100.0 / data.total;
+    }
+    node = $(nodeContent.format(nodeContentFormatter));
+  }
+  if (!visible) {
+    node.css('display', 'none');
+  }
+  node.data("data", data);
+  parentNode.find(' > ul').append(node);
+  return node;
+}
+
+function renderTestClassChildren(testClassNode, testClass, statusFilter) {
+  if (testClass.testGroups) {
+    for (var j = 0; j < testClass.testGroups.length; j++) {
+      var testGroup = testClass.testGroups[j];
+      var testGroupNode = appendToNode(testClassNode, testGroup, statusFilter, false, false);
+      if (!testGroupNode) continue;
+
+      for (var k = 0; k < testGroup.testCases.length; k++) {
+        var testCase = testGroup.testCases[k];
+        appendToNode(testGroupNode, testCase, statusFilter, false);
       }
-      node = $(nodeContent.format(nodeContentFormatter));
     }
-    if (!visible) {
-      node.css('display', 'none');
+  } else {
+    for (var k = 0; k < testClass.testCases.length; k++) {
+      var testCase = testClass.testCases[k];
+      appendToNode(testClassNode, testCase, statusFilter, false);
     }
-    node.data("data", data);
-    parentNode.find(' > ul').append(node);
-    return node;
   }
+}
 
+function renderTreePanel(testSuite, statusFilter) {
   function renderTree(parentNode, data) {
-    var currentNode = appendToNode(parentNode, data, true, true);
+    var currentNode = appendToNode(parentNode, data, statusFilter, true, true);
     if (!currentNode) return;
 
     if (data.testModules) {
@@ -687,27 +779,8 @@ function renderTreePanel(testSuite, statusFilter) {
     }
     if (data.testClasses) {
       for (var i = 0; i < data.testClasses.length; i++) {
-        var testClass = data.testClasses[i];
-        var testClassNode = appendToNode(currentNode, testClass, true, false);
-        if (!testClassNode) continue;
-
-        if (testClass.testGroups) {
-          for (var j = 0; j < testClass.testGroups.length; j++) {
-            var testGroup = testClass.testGroups[j];
-            var testGroupNode = appendToNode(testClassNode, testGroup, false, false);
-            if (!testGroupNode) continue;
-
-            for (var k = 0; k < testGroup.testCases.length; k++) {
-              var testCase = testGroup.testCases[k];
-              appendToNode(testGroupNode, testCase, false);
-            }
-          }
-        } else {
-          for (var k = 0; k < testClass.testCases.length; k++) {
-            var testCase = testClass.testCases[k];
-            appendToNode(testClassNode, testCase, false);
-          }
-        }
+        // the children of test class are rendered when it is expanded
+        appendToNode(currentNode, data.testClasses[i], statusFilter, true, false);
       }
     }
   }
@@ -719,6 +792,10 @@ function renderTreePanel(testSuite, statusFilter) {
   renderTree($('.navigation .tree'), testSuite);
 }
 
+function encodeImagePath(path) {
+  return path.split('/').map(encodeURIComponent).join('/');
+}
+
 function renderTestFixturePanel(detailPanel, data) {
   var testFixturePanel = $('<div class="test-fixture panel"><div class="panel-heading"></div><div class="panel-body"><table></table></div></div>');
   var panelHeader = testFixturePanel.find('.panel-heading');
@@ -747,16 +824,18 @@ function renderTestFixturePanel(detailPanel, data) {
     var time = data.logs[i].time;
     var log = $('<p><span class="log-level" title="{0}">[{1}]</span>&nbsp;<span class="{1}">{2}</span></p>'.format(time, level, message));
     logs.append(log);
+    // the images of a log are shown in one lightbox group
+    var lightboxGroup = data.fullName + '-' + i;
     if (data.logs[i].screenshots) {
       var screenshots = $('<div class="images"></div>');
       for (var j = 0; j < data.logs[i].screenshots.length; j++) {
         var screenshotData = data.logs[i].screenshots[j];
         var screenshot;
         if (screenshotData.error) {
-          screenshot =  $('<div class="image"><a class="link" href="" data-lightbox="{0}" data-title="{1}" title="{2}"><img src="data:image/svg+xml;base64,PD94bWwgdmVyc2lvbj0iMS4wIj8+Cjxzdmcgd2lkdGg9IjE5MjAiIGhlaWdodD0iMTA4MCIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIiB4bWxuczpzdmc9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KIDwhLS0gQ3JlYXRlZCB3aXRoIFNWRy1lZGl0IC0gaHR0cDovL3N2Zy1lZGl0Lmdvb2dsZWNvZGUuY29tLyAtLT4KIDxnPgogIDx0aXRsZT5MYXllciAxPC90aXRsZT4KICA8bGluZSBzdHJva2U9IiNlZDFjMjQiIGlkPSJzdmdfNyIgeTI9IjEwODAiIHgyPSIxOTIwIiB5MT0iMCIgeDE9IjAiIHN0cm9rZS1saW5lY2FwPSJudWxsIiBzdHJva2UtbGluZWpvaW49Im51bGwiIHN0cm9rZS1kYXNoYXJyYXk9Im51bGwiIHN0cm9rZS13aWR0aD0iMTAiIGZpbGw9Im5vbmUiLz4KICA8bGluZSBzdHJva2U9IiNlZDFjMjQiIGlkPSJzdmdfOCIgeTI9IjEwODAiIHgyPSIwIiB5MT0iMCIgeDE9IjE5MjAiIHN0cm9rZS1saW5lY2FwPSJudWxsIiBzdHJva2UtbGluZWpvaW49Im51bGwiIHN0cm9rZS1kYXNoYXJyYXk9Im51bGwiIHN0cm9rZS13aWR0aD0iMTAiIGZpbGw9Im5vbmUiLz4KIDwvZz4KPC9zdmc+" /></a></div>'.format(screenshotData.path.substring(0, screenshotData.path.lastIndexOf("-")), screenshotData.error, screenshotData.source));
+          screenshot =  $('<div class="image"><a class="link" href="" data-lightbox="{0}" data-title="{1}" title="{2}"><img src="data:image/svg+xml;base64,PD94bWwgdmVyc2lvbj0iMS4wIj8+Cjxzdmcgd2lkdGg9IjE5MjAiIGhlaWdodD0iMTA4MCIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIiB4bWxuczpzdmc9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KIDwhLS0gQ3JlYXRlZCB3aXRoIFNWRy1lZGl0IC0gaHR0cDovL3N2Zy1lZGl0Lmdvb2dsZWNvZGUuY29tLyAtLT4KIDxnPgogIDx0aXRsZT5MYXllciAxPC90aXRsZT4KICA8bGluZSBzdHJva2U9IiNlZDFjMjQiIGlkPSJzdmdfNyIgeTI9IjEwODAiIHgyPSIxOTIwIiB5MT0iMCIgeDE9IjAiIHN0cm9rZS1saW5lY2FwPSJudWxsIiBzdHJva2UtbGluZWpvaW49Im51bGwiIHN0cm9rZS1kYXNoYXJyYXk9Im51bGwiIHN0cm9rZS13aWR0aD0iMTAiIGZpbGw9Im5vbmUiLz4KICA8bGluZSBzdHJva2U9IiNlZDFjMjQiIGlkPSJzdmdfOCIgeTI9IjEwODAiIHgyPSIwIiB5MT0iMCIgeDE9IjE5MjAiIHN0cm9rZS1saW5lY2FwPSJudWxsIiBzdHJva2UtbGluZWpvaW49Im51bGwiIHN0cm9rZS1kYXNoYXJyYXk9Im51bGwiIHN0cm9rZS13aWR0aD0iMTAiIGZpbGw9Im5vbmUiLz4KIDwvZz4KPC9zdmc+" /></a></div>'.format(lightboxGroup + '-screenshots', screenshotData.error, screenshotData.source));
         } else {
           var dataTitle = screenshotData.source === "Desktop" ? "Desktop" : screenshotData.title + "\n" + screenshotData.url;
-          screenshot = $('<div class="image"><a class="link" href="{0}" data-lightbox="{1}" data-title="{2}" title="{3}"><img src="{0}" /></a></div>'.format(encodeURIComponent(screenshotData.path), screenshotData.path.substring(0, screenshotData.path.lastIndexOf("-")), dataTitle, screenshotData.source));
+          screenshot = $('<div class="image"><a class="link" href="{0}" data-lightbox="{1}" data-title="{2}" title="{3}"><img src="{0}" /></a></div>'.format(encodeImagePath(screenshotData.path), lightboxGroup + '-screenshots', dataTitle, screenshotData.source));
         }
         screenshots.append(screenshot);
       }
@@ -766,7 +845,7 @@ function renderTestFixturePanel(detailPanel, data) {
       var images = $('<div class="images"></div>');
       for (var k = 0; k < data.logs[i].images.length; k++) {
         var imageData = data.logs[i].images[k];
-        var image = $('<div class="image"><a class="link" href="{0}" data-lightbox="{1}" data-title="Image-{2}" title="Image-{2}"><img src="{0}" /></a></div>'.format(encodeURIComponent(imageData.path), imageData.path.substring(0, imageData.path.lastIndexOf("-")), k + 1));
+        var image = $('<div class="image"><a class="link" href="{0}" data-lightbox="{1}" data-title="Image-{2}" title="Image-{2}"><img src="{0}" /></a></div>'.format(encodeImagePath(imageData.path), lightboxGroup + '-images', k + 1));
         images.append(image)
       }
       logs.append(images);
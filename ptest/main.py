@@ -1,64 +1,59 @@
 import importlib
+import multiprocessing
 import os
 import shlex
 import traceback
+from concurrent.futures import ProcessPoolExecutor
 from xml.dom import minidom
+from xml.parsers import expat
+
+from typing import List, Tuple
 
 from .util import make_dirs, remove_tree
 
 
 def get_rerun_targets(xml_file: str):
     test_targets = []
-    doc = minidom.parse(xml_file)
-    if doc.documentElement.nodeName == "testsuites":
-        root = doc.documentElement
-    else:
-        root = doc
-    for test_suite_node in root.getElementsByTagName("testsuite"):
-        for test_case_node in test_suite_node.getElementsByTagName("testcase"):
-            if test_case_node.getElementsByTagName("failure") or test_case_node.getElementsByTagName("skipped"):
-                test_target = "%s.%s" % (test_case_node.getAttribute("classname"), test_case_node.getAttribute("name"))
-                test_targets.append(test_target)
+    for test_case_name, test_case_status, _, _ in _scan_junit_xml(xml_file)[1]:
+        if test_case_status != 0:
+            test_targets.append(test_case_name)
     return test_targets
 
 
-def merge_junit_xmls(xml_files: str, to_file: str):
+def merge_junit_xmls(xml_files: str, to_file: str, processes: int = 1):
     from .plogger import pconsole
+    from .reporter import write_xml_element
     from .test_suite import default_test_suite
 
     pconsole.write_line("Start to merge junit result xmls...")
 
+    # test case name -> (status, index of xml file, start offset, end offset)
     test_case_results = {}
 
-    for xml_file in xml_files:
-        doc = minidom.parse(xml_file)
-        if doc.documentElement.nodeName == "testsuites":
-            root = doc.documentElement
-        else:
-            root = doc
-        for test_suite_node in root.getElementsByTagName("testsuite"):
-            for test_case_node in test_suite_node.getElementsByTagName("testcase"):
-                test_case_name = "%s.%s" % (test_case_node.getAttribute("classname"), test_case_node.getAttribute("name"))
-                test_case_status = 0  # passed
-                if test_case_node.getElementsByTagName("failure"):
-                    test_case_status = 1  # failed
-                elif test_case_node.getElementsByTagName("skipped"):
-                    test_case_status = 2  # skipped
-
-                if test_case_name not in test_case_results or test_case_status < test_case_results[test_case_name]["status"]:
-                    test_case_results[test_case_name] = {"status": test_case_status, "node": test_case_node}
-
-    doc = minidom.Document()
-    test_suite_ele = doc.createElement("testsuite")
-    doc.appendChild(test_suite_ele)
+    if processes > 1:
+        process_pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+        scan_results = process_pool.map(_scan_junit_xml, xml_files)
+    else:
+        process_pool = None
+        scan_results = map(_scan_junit_xml, xml_files)
+    encodings = []
+    try:
+        for xml_file_index, (encoding, test_cases) in enumerate(scan_results):
+            encodings.append(encoding)
+            for test_case_name, test_case_status, start, end in test_cases:
+                if test_case_name not in test_case_results or test_case_status < test_case_results[test_case_name][0]:
+                    test_case_results[test_case_name] = (test_case_status, xml_file_index, start, end)
+    finally:
+        if process_pool:
+            process_pool.shutdown()
+
+    test_suite_ele = minidom.Document().createElement("testsuite")
     test_suite_ele.setAttribute("name", default_test_suite.name)
     test_suite_ele.setAttribute("tests", str(len(test_case_results)))
-    test_suite_ele.setAttribute("failures", str(len([result for result in test_case_results.values() if result["status"] == 1])))
-    test_suite_ele.setAttribute("skips", str(len([result for result in test_case_results.values() if result["status"] == 2])))
+    test_suite_ele.setAttribute("failures", str(len([result for result in test_case_results.values() if result[0] == 1])))
+    test_suite_ele.setAttribute("skips", str(len([result for result in test_case_results.values() if result[0] == 2])))
     test_suite_ele.setAttribute("errors", "0")
-
-    for test_case_result in test_case_results.values():
-        test_suite_ele.appendChild(test_case_result["node"])
+    test_suite_xml = write_xml_element(test_suite_ele, "\t")
 
     if os.path.exists(to_file):
         pconsole.write_line("Cleaning old merged junit result xml...")
@@ -67,13 +62,123 @@ def merge_junit_xmls(xml_files: str, to_file: str):
         make_dirs(os.path.dirname(to_file))
 
     f = open(to_file, mode="w", encoding="utf-8")
+    xml_file_objects = {}
     try:
-        doc.writexml(f, "\t", "\t", "\n", "utf-8")
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        if test_case_results:
+            f.write(test_suite_xml[:-len("/>\n")] + ">\n")
+            # copy the <testcase> elements from the xml files
+            for _, xml_file_index, start, end in test_case_results.values():
+                if xml_file_index not in xml_file_objects:
+                    xml_file_objects[xml_file_index] = open(xml_files[xml_file_index], mode="rb")
+                test_case_xml = _read_junit_test_case_xml(xml_file_objects[xml_file_index], start, end)
+                f.write("\t\t%s\n" % test_case_xml.decode(encodings[xml_file_index]))
+            f.write("\t</testsuite>\n")
+        else:
+            f.write(test_suite_xml)
         pconsole.write_line("Merged junit xml is generated at %s" % to_file)
     except Exception:
         pconsole.write_line("Failed to generate merged junit xml.\n%s" % traceback.format_exc())
     finally:
         f.close()
+        for xml_file_object in xml_file_objects.values():
+            xml_file_object.close()
+
+
+def _scan_junit_xml(xml_file: str) -> Tuple[str, List[tuple]]:
+    """
+        Scan the test cases in junit xml without building the document.
+
+    :return: the encoding of the xml and the test cases in it (name, status, start offset, end offset),
+        status 0 is passed, 1 is failed and 2 is skipped.
+    """
+    encoding = "utf-8"
+    test_cases = []
+    test_case = None
+    parser = expat.ParserCreate()
+
+    def on_xml_decl(version, xml_encoding, standalone):
+        nonlocal encoding
+        if xml_encoding:
+            encoding = xml_encoding
+
+    def on_start_element(name, attributes):
+        nonlocal test_case
+        if name == "testcase":
+            test_case = ["%s.%s" % (attributes.get("classname", ""), attributes.get("name", "")), 0, parser.CurrentByteIndex]
+        elif test_case is not None and name == "failure":
+            test_case[1] = 1
+        elif test_case is not None and name == "skipped" and test_case[1] == 0:
+            test_case[1] = 2
+
+    def on_end_element(name):
+        nonlocal test_case
+        if name == "testcase":
+            # it is the start of end tag, or the end of empty-element tag
+            test_cases.append((test_case[0], test_case[1], test_case[2], parser.CurrentByteIndex))
+            test_case = None
+
+    parser.XmlDeclHandler = on_xml_decl
+    parser.StartElementHandler = on_start_element
+    parser.EndElementHandler = on_end_element
+    with open(xml_file, mode="rb") as f:
+        parser.ParseFile(f)
+    return encoding, test_cases
+
+
+def _read_junit_test_case_xml(xml_file_object, start: int, end: int) -> bytes:
+    xml_file_object.seek(start)
+    test_case_xml = xml_file_object.read(end - start)
+    end_tag = xml_file_object.read(len(b"</testcase"))
+    if end_tag == b"</testcase":
+        test_case_xml += end_tag
+        while not test_case_xml.endswith(b">"):
+            test_case_xml += xml_file_object.read(1)
+    return test_case_xml
+
+
+def hook_web_driver():
+    """
+        Add webdriver instance to test executor to support capturing screenshot for webdriver.
+    """
+    from . import test_executor
+    try:
+        from selenium.webdriver.remote.webdriver import WebDriver
+    except ImportError as ie:
+        pass
+    else:
+        def add_web_driver(executor, web_driver):
+            web_drivers = executor.get_property("web_drivers")
+            if web_drivers is None:
+                web_drivers = []
+                executor.update_properties({"web_drivers": web_drivers})
+            web_drivers.append(web_driver)
+
+        def new_start_client(self):
+            try:
+                current_executor = test_executor.current_executor()
+                add_web_driver(current_executor, self)
+                add_web_driver(current_executor.parent_test_executor, self)
+                add_web_driver(current_executor.parent_test_executor.parent_test_executor, self)
+            except AttributeError as ae:
+                pass
+
+        def remove_web_driver(executor, web_driver):
+            web_drivers = executor.get_property("web_drivers")
+            if web_drivers:
+                web_drivers.remove(web_driver)
+
+        def new_stop_client(self):
+            try:
+                current_executor = test_executor.current_executor()
+                remove_web_driver(current_executor, self)
+                remove_web_driver(current_executor.parent_test_executor, self)
+                remove_web_driver(current_executor.parent_test_executor.parent_test_executor, self)
+            except AttributeError as ae:
+                pass
+
+        WebDriver.start_client = new_start_client
+        WebDriver.stop_client = new_stop_client
 
 
 def main(args=None):
@@ -92,12 +197,27 @@ def main(args=None):
     # merge junit result xmls
     junit_xmls = config.get_option("merge_junit_xmls")
     if junit_xmls is not None:
-        merge_junit_xmls(junit_xmls, config.get_option("to"))
+        merge_junit_xmls(junit_xmls, config.get_option("to"), int(config.get_option("test_executor_number")))
         return
 
+    from .plogger import pconsole, pconsole_err
+    if config.get_option("buffered_console"):
+        pconsole.start_buffering()
+        pconsole_err.start_buffering()
+    try:
+        run_test()
+    finally:
+        pconsole.stop_buffering()
+        pconsole_err.stop_buffering()
+
+
+def run_test():
+    import sys
+    from . import config
+
     # run test
     from .test_filter import TestFilterGroup, TestIncludeTagsFilter, TestExcludeTagsFilter, TestIncludeGroupsFilter
-    from . import test_executor, reporter, plistener
+    from . import test_executor, reporter, plistener, screen_capturer, timings
     from .test_finder import TestFinder
     from .test_suite import default_test_suite
     from .plogger import pconsole
@@ -118,6 +238,15 @@ def main(args=None):
             sys.path.append(python_path)
             pconsole.write_line(" %s" % python_path)
 
+    # run as worker of coordinator
+    worker_address = config.get_option("worker")
+    if worker_address is not None:
+        from .distributed_executor import parse_address, run_worker
+        pconsole.write_line("Connecting to coordinator %s..." % worker_address)
+        hook_web_driver()
+        run_worker(parse_address(worker_address), config.get_option("auth_key").encode("utf-8"))
+        return
+
     # test filter group
     test_filter_group = TestFilterGroup()
 
@@ -152,11 +281,12 @@ def main(args=None):
         for test_target in test_targets:
             test_finder = TestFinder(test_target, test_filter_group, default_test_suite)
             test_finder.find_tests()
+            found_message = "%s tests found" % test_finder.found_test_count
+            if test_finder.found_test_case_stream_count:
+                found_message += ", %s streaming data providers found" % test_finder.found_test_case_stream_count
             if test_finder.repeated_test_count:
-                pconsole.write_line(
-                    " %s (%s tests found, %s repeated)" % (test_target, test_finder.found_test_count, test_finder.repeated_test_count))
-            else:
-                pconsole.write_line(" %s (%s tests found)" % (test_target, test_finder.found_test_count))
+                found_message += ", %s repeated" % test_finder.repeated_test_count
+            pconsole.write_line(" %s (%s)" % (test_target, found_message))
     else:
         # rerun failed/skipped test cases
         pconsole.write_line("Run failed/skipped tests in junit xml:")
@@ -166,10 +296,14 @@ def main(args=None):
         for test_target in test_targets:
             test_finder = TestFinder(test_target, test_filter_group, default_test_suite)
             test_finder.find_tests()
-            found_test_count += test_finder.found_test_count
+            found_test_count += test_finder.found_test_count + test_finder.found_test_case_stream_count
         pconsole.write_line(" %s (%s tests found)" % (junit_xml, found_test_count))
 
     # add test listeners
+    junit_xml_writer = reporter.JUnitXmlWriter(config.get_option("junit_xml"))
+    plistener.test_listeners.append(junit_xml_writer)
+    html_report_writer = reporter.HtmlReportWriter(config.get_option("report_dir"), config.get_option("live_report"))
+    plistener.test_listeners.append(html_report_writer)
     listener_paths = config.get_option("test_listeners")
     if listener_paths is not None:
         pconsole.write_line("Test listeners:")
@@ -179,55 +313,24 @@ def main(args=None):
             listener_module = importlib.import_module(".".join(splitted_listener_path[:-1]))
             listener_class = getattr(listener_module, splitted_listener_path[-1])
             plistener.test_listeners.append(listener_class())
+    # the built-in junit xml and html report writers are notified asynchronously too
+    if config.get_option("async_listeners"):
+        plistener.test_listeners.enable_async_dispatch(int(config.get_option("listener_queue_size")),
+                                                       config.get_option("listener_queue_policy"))
 
     # init test suite
-    default_test_suite.init()
+    default_test_suite.init(timings.load_test_case_timings(config.get_option("timings_file")))
     test_cases = default_test_suite.test_cases
+    test_case_streams = default_test_suite.test_case_streams
 
     # exit if no tests found
-    if len(test_cases) == 0:
+    if len(test_cases) == 0 and len(test_case_streams) == 0:
         pconsole.write_line("=" * 100)
         pconsole.write_line("No tests found. Please check your command line options.")
         return
 
     # add webdriver instance to test executor to support capturing screenshot for webdriver
-    try:
-        from selenium.webdriver.remote.webdriver import WebDriver
-    except ImportError as ie:
-        pass
-    else:
-        def add_web_driver(executor, web_driver):
-            web_drivers = executor.get_property("web_drivers")
-            if web_drivers is None:
-                web_drivers = []
-                executor.update_properties({"web_drivers": web_drivers})
-            web_drivers.append(web_driver)
-
-        def new_start_client(self):
-            try:
-                current_executor = test_executor.current_executor()
-                add_web_driver(current_executor, self)
-                add_web_driver(current_executor.parent_test_executor, self)
-                add_web_driver(current_executor.parent_test_executor.parent_test_executor, self)
-            except AttributeError as ae:
-                pass
-
-        def remove_web_driver(executor, web_driver):
-            web_drivers = executor.get_property("web_drivers")
-            if web_drivers:
-                web_drivers.remove(web_driver)
-
-        def new_stop_client(self):
-            try:
-                current_executor = test_executor.current_executor()
-                remove_web_driver(current_executor, self)
-                remove_web_driver(current_executor.parent_test_executor, self)
-                remove_web_driver(current_executor.parent_test_executor.parent_test_executor, self)
-            except AttributeError as ae:
-                pass
-
-        WebDriver.start_client = new_start_client
-        WebDriver.stop_client = new_stop_client
+    hook_web_driver()
 
     # print test names
     pconsole.write_line("=" * 100)
@@ -235,6 +338,12 @@ def main(args=None):
     pconsole.write_line("-" * 30)
     for test_case in test_cases:
         pconsole.write_line(" %s" % test_case.full_name)
+    if test_case_streams:
+        pconsole.write_line("and the tests of following streaming data providers:")
+        pconsole.write_line("-" * 30)
+        for test_case_stream in test_case_streams:
+            for test_target in test_case_stream.test_targets:
+                pconsole.write_line(" %s" % test_target)
     pconsole.write_line("=" * 100)
 
     # clean and create temp dir
@@ -244,22 +353,49 @@ def main(args=None):
     else:
         make_dirs(temp_dir)
 
+    # the images are saved to html report dir during the run
+    reporter.init_html_report_dir(config.get_option("report_dir"))
+
     # run test cases
-    test_executor.TestSuiteExecutor(default_test_suite, int(config.get_option("test_executor_number"))).start_and_join()
+    test_executor_number = int(config.get_option("test_executor_number"))
+    if config.get_option("coordinator") is not None:
+        import secrets
+        from .distributed_executor import parse_address, DistributedTestSuiteExecutor
+        auth_key = config.get_option("auth_key")
+        if auth_key is None:
+            auth_key = secrets.token_hex(16)
+            pconsole.write_line("Auth key of coordinator: %s" % auth_key)
+        test_suite_executor = DistributedTestSuiteExecutor(default_test_suite, test_executor_number,
+                                                           parse_address(config.get_option("coordinator")),
+                                                           auth_key.encode("utf-8"), int(config.get_option("local_workers")))
+    elif config.get_option("executor_mode") == "process":
+        from .process_executor import ProcessTestSuiteExecutor
+        test_suite_executor = ProcessTestSuiteExecutor(default_test_suite, test_executor_number)
+    else:
+        test_suite_executor = test_executor.TestSuiteExecutor(default_test_suite, test_executor_number)
+    test_suite_executor.start_and_join()
 
     # log the test results
     status_count = default_test_suite.status_count
     pconsole.write_line("")
     pconsole.write_line("=" * 100)
     pconsole.write_line("Test finished in %.2fs." % default_test_suite.elapsed_time)
+    if status_count.total == 0:
+        pconsole.write_line("No tests found, the streaming data providers are empty.")
     pconsole.write_line("Total: %s, passed: %s, failed: %s, skipped: %s. Pass rate: %.1f%%." % (
         status_count.total, status_count.passed, status_count.failed, status_count.skipped, default_test_suite.pass_rate))
+    pconsole.write_line("Waiting for test executors: %.2fs." % test_suite_executor.test_worker_pool.waiting_time)
+    if not config.get_option("disable_screenshot"):
+        screenshot_counter = screen_capturer.get_screenshot_counter()
+        pconsole.write_line("Screenshots: taken %s, reused %s, skipped %s, failed %s." % (
+            screenshot_counter.taken, screenshot_counter.reused, screenshot_counter.skipped, screenshot_counter.failed))
 
     # generate the test report
     pconsole.write_line("")
     pconsole.write_line("=" * 100)
-    reporter.generate_junit_xml(config.get_option("junit_xml"))
-    reporter.generate_html_report(config.get_option("report_dir"))
+    reporter.generate_junit_xml(config.get_option("junit_xml"), junit_xml_writer)
+    reporter.generate_html_report(config.get_option("report_dir"), html_report_writer)
+    timings.save_test_case_timings(config.get_option("timings_file"), default_test_suite)
 
     # clean temp dir
     remove_tree(temp_dir)
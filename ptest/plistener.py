@@ -1,4 +1,8 @@
+import threading
 import traceback
+from collections import deque
+
+from typing import List
 
 from .test_suite import TestSuite, TestClass, TestGroup, TestCase
 
@@ -28,11 +32,21 @@ class TestListener(object):
     def on_test_case_finish(self, test_case: TestCase):
         pass
 
+    def on_test_cases_finish(self, test_cases: List[TestCase]):
+        """
+            Called with the test cases finished since last call if the test listeners are notified asynchronously (--async-listeners).
+            It calls on_test_case_finish() for each test case by default.
+        """
+        for test_case in test_cases:
+            self.on_test_case_finish(test_case)
+
 
 class TestListenerGroup(object):
     def __init__(self):
         self.__test_listeners = []
         self.__outer_test_listener = None
+        self.__async_dispatch_options = None
+        self.__dispatcher = None
 
     def append(self, test_listener: TestListener):
         self.__test_listeners.append(test_listener)
@@ -40,93 +54,141 @@ class TestListenerGroup(object):
     def set_outer_test_listener(self, outer_test_listener: TestListener):
         self.__outer_test_listener = outer_test_listener
 
+    def enable_async_dispatch(self, queue_size: int, queue_policy: str):
+        """
+            Notify the test listeners in a dedicated thread, so the slow test listeners don't hold the test executors.
+            The events are dispatched from test suite start to test suite finish, and they are all delivered before the test suite finishes.
+
+        :param queue_size: the max number of pending events.
+        :param queue_policy: "block" to wait for free space when the queue is full, or "drop" to drop the test class/group/case events.
+        """
+        self.__async_dispatch_options = (queue_size, queue_policy)
+
     def on_test_suite_start(self, test_suite: TestSuite):
         if self.__outer_test_listener:
             self.__outer_test_listener.on_test_suite_start(test_suite)
-        for test_listener in self.__test_listeners:
-            try:
-                test_listener.on_test_suite_start(test_suite)
-            except Exception:
-                from .plogger import pconsole
-                pconsole.write_line("The test listener %s.%s raised exception:\n%s"
-                                    % (test_listener.__class__.__module__, test_listener.__class__.__name__, traceback.format_exc()))
+        if self.__async_dispatch_options and self.__test_listeners:
+            self.__dispatcher = _AsyncTestListenerDispatcher(self.__notify_test_listeners, *self.__async_dispatch_options)
+        self.__dispatch("on_test_suite_start", test_suite)
 
     def on_test_suite_finish(self, test_suite: TestSuite):
-        for test_listener in self.__test_listeners:
-            try:
-                test_listener.on_test_suite_finish(test_suite)
-            except Exception:
-                from .plogger import pconsole
-                pconsole.write_line("The test listener %s.%s raised exception:\n%s"
-                                    % (test_listener.__class__.__module__, test_listener.__class__.__name__, traceback.format_exc()))
+        self.__dispatch("on_test_suite_finish", test_suite)
+        if self.__dispatcher:
+            self.__dispatcher.shutdown()
+            self.__dispatcher = None
         if self.__outer_test_listener:
             self.__outer_test_listener.on_test_suite_finish(test_suite)
 
     def on_test_class_start(self, test_class: TestClass):
         if self.__outer_test_listener:
             self.__outer_test_listener.on_test_class_start(test_class)
-        for test_listener in self.__test_listeners:
-            try:
-                test_listener.on_test_class_start(test_class)
-            except Exception:
-                from .plogger import pconsole
-                pconsole.write_line("The test listener %s.%s raised exception:\n%s"
-                                    % (test_listener.__class__.__module__, test_listener.__class__.__name__, traceback.format_exc()))
+        self.__dispatch("on_test_class_start", test_class)
 
     def on_test_class_finish(self, test_class: TestClass):
-        for test_listener in self.__test_listeners:
-            try:
-                test_listener.on_test_class_finish(test_class)
-            except Exception:
-                from .plogger import pconsole
-                pconsole.write_line("The test listener %s.%s raised exception:\n%s"
-                                    % (test_listener.__class__.__module__, test_listener.__class__.__name__, traceback.format_exc()))
+        self.__dispatch("on_test_class_finish", test_class)
         if self.__outer_test_listener:
             self.__outer_test_listener.on_test_class_finish(test_class)
 
     def on_test_group_start(self, test_group: TestGroup):
         if self.__outer_test_listener:
             self.__outer_test_listener.on_test_group_start(test_group)
-        for test_listener in self.__test_listeners:
-            try:
-                test_listener.on_test_group_start(test_group)
-            except Exception:
-                from .plogger import pconsole
-                pconsole.write_line("The test listener %s.%s raised exception:\n%s"
-                                    % (test_listener.__class__.__module__, test_listener.__class__.__name__, traceback.format_exc()))
+        self.__dispatch("on_test_group_start", test_group)
 
     def on_test_group_finish(self, test_group: TestGroup):
-        for test_listener in self.__test_listeners:
-            try:
-                test_listener.on_test_group_finish(test_group)
-            except Exception:
-                from .plogger import pconsole
-                pconsole.write_line("The test listener %s.%s raised exception:\n%s"
-                                    % (test_listener.__class__.__module__, test_listener.__class__.__name__, traceback.format_exc()))
+        self.__dispatch("on_test_group_finish", test_group)
         if self.__outer_test_listener:
             self.__outer_test_listener.on_test_group_finish(test_group)
 
     def on_test_case_start(self, test_case: TestCase):
         if self.__outer_test_listener:
             self.__outer_test_listener.on_test_case_start(test_case)
-        for test_listener in self.__test_listeners:
-            try:
-                test_listener.on_test_case_start(test_case)
-            except Exception:
-                from .plogger import pconsole
-                pconsole.write_line("The test listener %s.%s raised exception:\n%s"
-                                    % (test_listener.__class__.__module__, test_listener.__class__.__name__, traceback.format_exc()))
+        self.__dispatch("on_test_case_start", test_case)
 
     def on_test_case_finish(self, test_case: TestCase):
+        self.__dispatch("on_test_case_finish", test_case)
+        if self.__outer_test_listener:
+            self.__outer_test_listener.on_test_case_finish(test_case)
+
+    def __dispatch(self, event: str, argument):
+        if self.__dispatcher:
+            self.__dispatcher.put(event, argument)
+        else:
+            self.__notify_test_listeners(event, argument)
+
+    def __notify_test_listeners(self, event: str, argument):
         for test_listener in self.__test_listeners:
             try:
-                test_listener.on_test_case_finish(test_case)
+                getattr(test_listener, event)(argument)
             except Exception:
                 from .plogger import pconsole
                 pconsole.write_line("The test listener %s.%s raised exception:\n%s"
                                     % (test_listener.__class__.__module__, test_listener.__class__.__name__, traceback.format_exc()))
-        if self.__outer_test_listener:
-            self.__outer_test_listener.on_test_case_finish(test_case)
 
 
+class _AsyncTestListenerDispatcher(object):
+    """
+        Deliver the queued events to the test listeners in a dedicated thread.
+        The queued test case finish events are delivered to on_test_cases_finish() in one batch,
+        they are delivered before the test group/class/suite events but might be after the start of following test cases.
+    """
+    # the events which are never dropped
+    _REQUIRED_EVENTS = ("on_test_suite_start", "on_test_suite_finish")
+
+    def __init__(self, notify_test_listeners, queue_size: int, queue_policy: str):
+        self.__notify_test_listeners = notify_test_listeners
+        self.__queue_size = queue_size
+        self.__queue_policy = queue_policy
+        self.__events = deque()
+        self.__condition = threading.Condition()
+        self.__shutdown = False
+        self.__dropped_count = 0
+        self.__thread = threading.Thread(target=self.__deliver, name="ptest-listener-dispatcher")
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def put(self, event: str, argument):
+        with self.__condition:
+            while len(self.__events) >= self.__queue_size:
+                if self.__queue_policy == "drop" and event not in self._REQUIRED_EVENTS:
+                    self.__dropped_count += 1
+                    return
+                self.__condition.wait()
+            self.__events.append((event, argument))
+            self.__condition.notify_all()
+
+    def shutdown(self):
+        """
+            Wait for the queued events to be delivered and stop the dispatcher thread.
+        """
+        with self.__condition:
+            self.__shutdown = True
+            self.__condition.notify_all()
+        self.__thread.join()
+        if self.__dropped_count:
+            from .plogger import pconsole
+            pconsole.write_line("%s test listener events were dropped since the listener queue was full." % self.__dropped_count)
+
+    def __deliver(self):
+        while True:
+            with self.__condition:
+                while not self.__events and not self.__shutdown:
+                    self.__condition.wait()
+                if not self.__events:
+                    return
+                events = list(self.__events)
+                self.__events.clear()
+                # wake up the blocked producers
+                self.__condition.notify_all()
+            finished_test_cases = []
+            for event, argument in events:
+                if event == "on_test_case_finish":
+                    finished_test_cases.append(argument)
+                    continue
+                if event != "on_test_case_start" and finished_test_cases:
+                    self.__notify_test_listeners("on_test_cases_finish", finished_test_cases)
+                    finished_test_cases = []
+                self.__notify_test_listeners(event, argument)
+            if finished_test_cases:
+                self.__notify_test_listeners("on_test_cases_finish", finished_test_cases)
+
 test_listeners = TestListenerGroup()
@@ -1,24 +1,96 @@
+import itertools
 import logging
-import os
 import sys
-import uuid
+import threading
+from collections import deque
 from datetime import datetime
 from typing import List
 
-from ptest.util import escape_filename
-
 from . import config
 
 
 class PConsole:
     def __init__(self, out):
         self.out = out
+        self.__buffered_writer = None
 
     def write(self, msg: str):
-        self.out.write(str(msg))
+        buffered_writer = self.__buffered_writer
+        if buffered_writer is None:
+            self.out.write(str(msg))
+        else:
+            buffered_writer.write(str(msg))
 
     def write_line(self, msg: str):
-        self.out.write(str(msg) + "\n")
+        self.write(str(msg) + "\n")
+
+    def start_buffering(self, flush_interval: float = 0.1):
+        """
+            Buffer the messages of each thread and write them to the output in a dedicated thread in batches,
+            so the test executors do not wait for each other on the output.
+        """
+        if self.__buffered_writer is None:
+            self.__buffered_writer = _BufferedConsoleWriter(self, flush_interval)
+
+    def stop_buffering(self):
+        """
+            Write the buffered messages and stop buffering.
+        """
+        buffered_writer, self.__buffered_writer = self.__buffered_writer, None
+        if buffered_writer is not None:
+            buffered_writer.close()
+
+
+class _BufferedConsoleWriter:
+    def __init__(self, pconsole: PConsole, flush_interval: float):
+        self.pconsole = pconsole
+        self.flush_interval = flush_interval
+        self.__local = threading.local()
+        self.__buffers = []  # (thread, buffer)
+        self.__buffers_lock = threading.Lock()
+        self.__flush_lock = threading.Lock()
+        # the messages of all threads are written in the order they are written to pconsole
+        self.__sequence = itertools.count()
+        self.__closed = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, name="ptest-console-writer")
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def write(self, msg: str):
+        if self.__closed.is_set():
+            self.pconsole.out.write(msg)
+            return
+        buffer = getattr(self.__local, "buffer", None)
+        if buffer is None:
+            buffer = self.__local.buffer = deque()
+            with self.__buffers_lock:
+                self.__buffers.append((threading.current_thread(), buffer))
+        # appending to deque is atomic, the threads do not wait for each other
+        buffer.append((next(self.__sequence), msg))
+
+    def flush(self):
+        with self.__flush_lock:
+            with self.__buffers_lock:
+                buffers = [buffer for _, buffer in self.__buffers]
+                # the buffers of finished threads are dropped after they are drained
+                self.__buffers = [(thread, buffer) for thread, buffer in self.__buffers if thread.is_alive() or buffer]
+            messages = []
+            for buffer in buffers:
+                for _ in range(len(buffer)):
+                    messages.append(buffer.popleft())
+            if messages:
+                messages.sort()
+                self.pconsole.out.write("".join([msg for _, msg in messages]))
+                self.pconsole.out.flush()
+
+    def close(self):
+        self.__closed.set()
+        self.__thread.join()
+        self.flush()
+
+    def __run(self):
+        while not self.__closed.wait(self.flush_interval):
+            self.flush()
 
 
 pconsole = PConsole(sys.stdout)
@@ -46,6 +118,7 @@ class PReporter:
 
     def __log(self, level: int, msg: str, screenshot: bool = False, images: List[bytes] = []):
         from . import test_executor, screen_capturer
+        from .reporter import save_image
 
         try:
             running_test_fixture = test_executor.current_executor().get_property("running_test_fixture")
@@ -53,22 +126,12 @@ class PReporter:
             pconsole.write_line("[%s] %s" % (logging.getLevelName(level), msg))
         else:
             log = {"time": str(datetime.now()), "level": logging.getLevelName(level).lower(), "message": str(msg)}
-            log_hash_code = str(uuid.uuid4()).split("-")[0]
-            path_prefix = "%s-%s" % (escape_filename(running_test_fixture.full_name), log_hash_code)
             if screenshot and not config.get_option("disable_screenshot"):
-                log["screenshots"] = screen_capturer.take_screenshots(path_prefix)
+                log["screenshots"] = screen_capturer.take_screenshots()
             if images:
-                image_dicts = []
-                for index, image in enumerate(images):
-                    image_dict = {
-                        "path": "%s-image-%s.png" % (path_prefix, index + 1)
-                    }
-                    with open(os.path.join(config.get_option("temp"), image_dict["path"]), mode="wb") as f:
-                        f.write(image)
-                    image_dicts.append(image_dict)
-                log["images"] = image_dicts
-
-            running_test_fixture.logs.append(log)
+                log["images"] = [{"path": save_image(image)} for image in images]
+
+            running_test_fixture.add_log(log)
 
             if config.get_option("verbose"):
                 # output to pconsole
@@ -0,0 +1,269 @@
+import multiprocessing
+import pickle
+import sys
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from typing import List
+
+from . import config
+from .enumeration import TestFixtureStatus
+from .plistener import test_listeners
+from .plogger import pconsole
+from .screen_capturer import get_screenshot_counter, init_screenshot_counter, wait_for_screenshots
+from .test_executor import TestExecutor, TestSuiteExecutor, TestClassRunGroupExecutor
+from .test_suite import TestSuite, TestClass, TestFixture
+
+_worker_context = {}
+
+
+class ProcessTestSuiteExecutor(TestSuiteExecutor):
+    """
+        Run the @BeforeSuite and @AfterSuite in current process,
+        and distribute the test class run groups to a pool of worker processes.
+    """
+
+    def __init__(self, test_suite: TestSuite, workers: int):
+        TestSuiteExecutor.__init__(self, test_suite, workers)
+        self.process_pool = None
+
+    def _run_test_class_run_groups(self):
+        # the worker processes are started after @BeforeSuite, so they can receive its status and attributes
+        initargs = (sys.path, config._options, config._properties, self.test_suite.before_suite.status,
+                    get_before_suite_state(self.test_suite), get_screenshot_counter().counts)
+        with ProcessPoolExecutor(max_workers=self.test_worker_pool.workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker_process, initargs=initargs) as self.process_pool:
+            yield [TestClassRunGroupProcessExecutor(self, test_class_run_group) for test_class_run_group in
+                   self.test_suite.test_class_run_groups]
+        self.process_pool = None
+
+
+class TestClassRunGroupProcessExecutor(TestExecutor):
+    def __init__(self, process_test_suite_executor: ProcessTestSuiteExecutor, test_class_run_group: List[TestClass]):
+        TestExecutor.__init__(self, process_test_suite_executor)
+        self.test_class_run_group = test_class_run_group
+
+    def _run(self):
+        test_class_names = [test_class.full_name for test_class in self.test_class_run_group]
+        test_case_names = get_test_case_targets(self.test_class_run_group)
+        future = self.parent_test_executor.process_pool.submit(_run_test_class_run_group_in_worker_process, test_class_names,
+                                                               test_case_names)
+        try:
+            test_class_results = future.result()
+        except Exception:
+            fail_test_class_run_group(self.test_class_run_group, "The worker process failed to run this test.", traceback.format_exc())
+        else:
+            for test_class_result in test_class_results:
+                merge_test_class_result(self.parent_test_executor.test_suite, test_class_result)
+
+        notify_test_listeners(self.test_class_run_group)
+
+
+class _WorkerTestSuiteExecutor(TestSuiteExecutor):
+    def __init__(self, test_suite: TestSuite, test_class_run_group: List[TestClass], workers: int):
+        TestSuiteExecutor.__init__(self, test_suite, workers)
+        self.test_class_run_group = test_class_run_group
+
+    def _run(self):
+        yield TestClassRunGroupExecutor(self, self.test_class_run_group)
+        # the results are sent to the coordinator (or main process) with the images, they should be saved before that
+        wait_for_screenshots()
+
+
+def _init_worker_process(python_paths, options, properties, before_suite_status, before_suite_state, screenshot_counts):
+    sys.path[:] = python_paths
+    config._options.update(options)
+    config._properties.update(properties)
+    init_screenshot_counter(screenshot_counts)
+    from .main import hook_web_driver
+    hook_web_driver()
+    _worker_context["before_suite_status"] = before_suite_status
+    _worker_context["before_suite_state"] = before_suite_state
+
+
+def _run_test_class_run_group_in_worker_process(test_class_names: List[str], test_case_names: List[str]):
+    return run_test_class_run_group(test_class_names, test_case_names, _worker_context["before_suite_status"],
+                                    _worker_context["before_suite_state"], 1)
+
+
+def get_before_suite_state(test_suite: TestSuite) -> dict:
+    """
+        Get the picklable attributes set by @BeforeSuite, they are spread to the test classes run in other processes.
+    """
+    before_suite_state = {}
+    for key, value in test_suite.before_suite_state.items():
+        try:
+            pickle.dumps(value)
+        except Exception:
+            pconsole.write_line("The attribute <%s> set by %s is not picklable, so it is not available in worker processes."
+                                % (key, test_suite.before_suite.full_name))
+        else:
+            before_suite_state[key] = value
+    return before_suite_state
+
+
+def get_test_case_targets(test_class_run_group: List[TestClass]) -> List[str]:
+    """
+        Get the test targets of the test cases (including the streaming ones) of a test class run group, they are found by TestFinder in worker.
+    """
+    test_case_targets = []
+    for test_class in test_class_run_group:
+        test_case_targets.extend(test_case.full_name for test_case in test_class.test_cases)
+        for test_case_stream in test_class.test_case_streams:
+            test_case_targets.extend(test_case_stream.test_targets)
+    return test_case_targets
+
+
+def run_test_class_run_group(test_class_names: List[str], test_case_names: List[str], before_suite_status: TestFixtureStatus,
+                             before_suite_state: dict, workers: int) -> List[dict]:
+    """
+        Find and run the test cases of a test class run group in current process.
+
+    :return: the results of the test classes, see get_test_class_result().
+    """
+    from .test_filter import TestFilterGroup
+    from .test_finder import TestFinder
+
+    # the test cases of a data provider are found by one test finder, so the data provider is scanned only once
+    test_data_names = OrderedDict()  # test target without data name -> data names, None means all
+    for test_case_name in test_case_names:
+        test_target, separator, test_data_name = test_case_name.partition("#")
+        if not separator:
+            test_data_names[test_target] = None
+        elif test_data_names.setdefault(test_target, set()) is not None:
+            test_data_names[test_target].add(test_data_name)
+
+    test_suite = TestSuite("DefaultSuite")
+    for test_target, data_names in test_data_names.items():
+        TestFinder(test_target, TestFilterGroup(), test_suite, data_names).find_tests()
+    test_suite.init()
+
+    # the @BeforeSuite was run in main process
+    test_suite.before_suite.status = before_suite_status
+    test_suite.before_suite_state = before_suite_state
+
+    test_class_run_group = [test_suite.get_test_class(test_class_name) for test_class_name in test_class_names]
+    _WorkerTestSuiteExecutor(test_suite, test_class_run_group, workers).start_and_join()
+    return [get_test_class_result(test_class) for test_class in test_class_run_group]
+
+
+def notify_test_listeners(test_class_run_group: List[TestClass]):
+    """
+        Notify the test listeners in current process for a test class run group which was run in another process.
+    """
+    for test_class in test_class_run_group:
+        test_listeners.on_test_class_start(test_class)
+        for test_group in test_class.test_groups:
+            test_listeners.on_test_group_start(test_group)
+            for test_case in test_group.test_cases:
+                test_listeners.on_test_case_start(test_case)
+                test_listeners.on_test_case_finish(test_case)
+            test_listeners.on_test_group_finish(test_group)
+        test_listeners.on_test_class_finish(test_class)
+
+
+def get_test_class_result(test_class: TestClass) -> dict:
+    """
+        Get the picklable result of the test class, it can be merged into another test suite by merge_test_class_result().
+    """
+    return {
+        "fullName": test_class.full_name,
+        "startTime": test_class.start_time,
+        "endTime": test_class.end_time,
+        "beforeClass": _get_test_fixture_result(test_class.before_class),
+        "afterClass": _get_test_fixture_result(test_class.after_class),
+        "testGroups": [{
+            "name": test_group.name,
+            "startTime": test_group.start_time,
+            "endTime": test_group.end_time,
+            "beforeGroup": _get_test_fixture_result(test_group.before_group),
+            "afterGroup": _get_test_fixture_result(test_group.after_group),
+            "testCases": [{
+                "name": test_case.name,
+                "dataIndex": test_case.data_index,
+                "startTime": test_case.start_time,
+                "endTime": test_case.end_time,
+                "beforeMethod": _get_test_fixture_result(test_case.before_method),
+                "test": _get_test_fixture_result(test_case.test),
+                "afterMethod": _get_test_fixture_result(test_case.after_method),
+            } for test_case in test_group.test_cases]
+        } for test_group in test_class.test_groups]
+    }
+
+
+def merge_test_class_result(test_suite: TestSuite, test_class_result: dict):
+    test_class = test_suite.get_test_class(test_class_result["fullName"])
+    test_class.start_time = test_class_result["startTime"]
+    test_class.end_time = test_class_result["endTime"]
+    _merge_test_fixture_result(test_class.before_class, test_class_result["beforeClass"])
+    _merge_test_fixture_result(test_class.after_class, test_class_result["afterClass"])
+    for test_group_result in test_class_result["testGroups"]:
+        test_group = test_class.get_test_group(test_group_result["name"])
+        test_group.start_time = test_group_result["startTime"]
+        test_group.end_time = test_group_result["endTime"]
+        _merge_test_fixture_result(test_group.before_group, test_group_result["beforeGroup"])
+        _merge_test_fixture_result(test_group.after_group, test_group_result["afterGroup"])
+        for test_case_result in test_group_result["testCases"]:
+            test_case = test_group.get_test_case(test_case_result["name"])
+            if test_case is None:
+                # the test case of streaming data provider was created in worker
+                test_case_stream = test_group.get_test_case_stream(test_case_result["name"].split("#")[0])
+                test_case = test_case_stream.add_finished_test_case(test_case_result["name"], test_case_result["dataIndex"])
+            test_case.start_time = test_case_result["startTime"]
+            test_case.end_time = test_case_result["endTime"]
+            _merge_test_fixture_result(test_case.before_method, test_case_result["beforeMethod"])
+            _merge_test_fixture_result(test_case.test, test_case_result["test"])
+            _merge_test_fixture_result(test_case.after_method, test_case_result["afterMethod"])
+
+
+def fail_test_class_run_group(test_class_run_group: List[TestClass], failure_message: str, stack_trace: str):
+    """
+        Mark all the tests in the test class run group as failed, it is used when the test class run group cannot be run.
+    """
+    now = datetime.now()
+    for test_class in test_class_run_group:
+        test_fixtures = [test_class.before_class, test_class.after_class]
+        containers = [test_class] + test_class.test_groups + test_class.test_cases
+        for test_group in test_class.test_groups:
+            test_fixtures.extend([test_group.before_group, test_group.after_group])
+        for test_case in test_class.test_cases:
+            test_fixtures.extend([test_case.before_method, test_case.test, test_case.after_method])
+            test_case.test.status = TestFixtureStatus.FAILED
+            test_case.test.failure_message = failure_message
+            test_case.test.failure_type = "WorkerProcessError"
+            test_case.test.stack_trace = stack_trace
+        for container in containers:
+            container.start_time = container.end_time = now
+        for test_fixture in test_fixtures:
+            if not test_fixture.is_empty:
+                test_fixture.start_time = test_fixture.end_time = now
+
+
+def _get_test_fixture_result(test_fixture: TestFixture) -> dict:
+    if test_fixture.is_empty:
+        return {"status": test_fixture.status}
+    return {
+        "status": test_fixture.status,
+        "failureMessage": test_fixture.failure_message,
+        "failureType": test_fixture.failure_type,
+        "stackTrace": test_fixture.stack_trace,
+        "skipMessage": test_fixture.skip_message,
+        "startTime": test_fixture.start_time,
+        "endTime": test_fixture.end_time,
+        "logs": test_fixture.logs,
+    }
+
+
+def _merge_test_fixture_result(test_fixture: TestFixture, test_fixture_result: dict):
+    test_fixture.status = test_fixture_result["status"]
+    if test_fixture.is_empty:
+        return
+    test_fixture.failure_message = test_fixture_result["failureMessage"]
+    test_fixture.failure_type = test_fixture_result["failureType"]
+    test_fixture.stack_trace = test_fixture_result["stackTrace"]
+    test_fixture.skip_message = test_fixture_result["skipMessage"]
+    test_fixture.start_time = test_fixture_result["startTime"]
+    test_fixture.end_time = test_fixture_result["endTime"]
+    test_fixture.logs = test_fixture_result["logs"]
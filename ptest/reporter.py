@@ -1,8 +1,13 @@
+import hashlib
+import io
 import json
 import os
 import platform
 import shutil
+import threading
+import time
 import traceback
+import uuid
 from datetime import datetime
 from xml.dom import minidom
 
@@ -10,6 +15,7 @@ from typing import List
 
 from . import config, __version__
 from .enumeration import TestCaseStatus
+from .plistener import TestListener
 from .plogger import pconsole
 from .test_suite import default_test_suite, TestSuite, TestGroup, TestClass, TestCase, TestFixture
 from .util import make_dirs, remove_tree, escape_html
@@ -17,11 +23,51 @@ from .util import make_dirs, remove_tree, escape_html
 current_dir = os.path.dirname(os.path.abspath(__file__))
 
 
-def generate_junit_xml(xml_file_path: str):
+class JUnitXmlWriter(TestListener):
+    """
+        Write the <testcase> elements of junit report to a part file as soon as the test cases are finished,
+        they are put together in the order of test suite by generate_junit_xml().
+    """
+
+    def __init__(self, xml_file_path: str):
+        self.part_file_path = xml_file_path + ".part"
+        self.__part_file = None
+        # test case -> (offset, length) of its <testcase> element in part file
+        self.__test_case_ranges = {}
+        self.__lock = threading.Lock()
+
+    def on_test_suite_start(self, test_suite: TestSuite):
+        make_dirs(os.path.dirname(self.part_file_path))
+        self.__part_file = open(self.part_file_path, mode="w+b")
+
+    def on_test_case_finish(self, test_case: TestCase):
+        test_case_xml = _get_junit_test_case_xml(test_case).encode("utf-8")
+        with self.__lock:
+            offset = self.__part_file.seek(0, os.SEEK_END)
+            self.__part_file.write(test_case_xml)
+            self.__part_file.flush()
+            self.__test_case_ranges[test_case] = (offset, len(test_case_xml))
+
+    def get_test_case_xml(self, test_case: TestCase) -> str:
+        with self.__lock:
+            test_case_range = self.__test_case_ranges.get(test_case)
+            if test_case_range is None:
+                return None
+            offset, length = test_case_range
+            self.__part_file.seek(offset)
+            return self.__part_file.read(length).decode("utf-8")
+
+    def close(self):
+        if self.__part_file:
+            self.__part_file.close()
+            self.__part_file = None
+            os.remove(self.part_file_path)
+        self.__test_case_ranges.clear()
+
+
+def generate_junit_xml(xml_file_path: str, junit_xml_writer: JUnitXmlWriter = None):
     pconsole.write_line("Generating junit report...")
-    doc = minidom.Document()
-    test_suite_ele = doc.createElement("testsuite")
-    doc.appendChild(test_suite_ele)
+    test_suite_ele = minidom.Document().createElement("testsuite")
     status_count = default_test_suite.status_count
     test_suite_ele.setAttribute("name", default_test_suite.name)
     test_suite_ele.setAttribute("tests", str(status_count.total))
@@ -30,23 +76,7 @@ def generate_junit_xml(xml_file_path: str):
     test_suite_ele.setAttribute("errors", "0")
     test_suite_ele.setAttribute("time", "%.3f" % default_test_suite.elapsed_time)
     test_suite_ele.setAttribute("timestamp", str(default_test_suite.start_time))
-
-    for test_case in default_test_suite.test_cases:
-        test_case_ele = doc.createElement("testcase")
-        test_suite_ele.appendChild(test_case_ele)
-        test_case_ele.setAttribute("name", test_case.name)
-        test_case_ele.setAttribute("classname", test_case.test_class.full_name)
-        test_case_ele.setAttribute("time", "%.3f" % test_case.elapsed_time)
-        if test_case.status == TestCaseStatus.SKIPPED:
-            skipped_ele = doc.createElement("skipped")
-            test_case_ele.appendChild(skipped_ele)
-            skipped_ele.setAttribute("message", test_case.skip_message)
-        elif test_case.status == TestCaseStatus.FAILED:
-            failure_ele = doc.createElement("failure")
-            test_case_ele.appendChild(failure_ele)
-            failure_ele.setAttribute("message", test_case.failure_message)
-            failure_ele.setAttribute("type", test_case.failure_type)
-            failure_ele.appendChild(doc.createTextNode(test_case.stack_trace))
+    test_suite_xml = write_xml_element(test_suite_ele, "\t")
 
     if os.path.exists(xml_file_path):
         pconsole.write_line("Cleaning old junit report...")
@@ -56,81 +86,257 @@ def generate_junit_xml(xml_file_path: str):
 
     f = open(xml_file_path, mode="w", encoding="utf-8")
     try:
-        doc.writexml(f, "\t", "\t", "\n", "utf-8")
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        if default_test_suite.test_cases:
+            # the <testcase> elements are written by JUnitXmlWriter when the test cases are finished
+            f.write(test_suite_xml[:-len("/>\n")] + ">\n")
+            for test_case in default_test_suite.test_cases:
+                test_case_xml = junit_xml_writer and junit_xml_writer.get_test_case_xml(test_case)
+                f.write(test_case_xml or _get_junit_test_case_xml(test_case))
+            f.write("\t</testsuite>\n")
+        else:
+            f.write(test_suite_xml)
         pconsole.write_line("junit report is generated at %s" % xml_file_path)
     except Exception as e:
         pconsole.write_line("Failed to generate junit report.\n%s" % traceback.format_exc())
     finally:
         f.close()
+        if junit_xml_writer:
+            junit_xml_writer.close()
 
 
-def generate_html_report(report_dir: str):
-    pconsole.write_line("Generating html report...")
-
+def _get_junit_test_case_xml(test_case: TestCase) -> str:
+    doc = minidom.Document()
+    test_case_ele = doc.createElement("testcase")
+    test_case_ele.setAttribute("name", test_case.name)
+    test_case_ele.setAttribute("classname", test_case.test_class.full_name)
+    test_case_ele.setAttribute("time", "%.3f" % test_case.elapsed_time)
+    if test_case.status == TestCaseStatus.SKIPPED:
+        skipped_ele = doc.createElement("skipped")
+        test_case_ele.appendChild(skipped_ele)
+        skipped_ele.setAttribute("message", test_case.skip_message)
+    elif test_case.status == TestCaseStatus.FAILED:
+        failure_ele = doc.createElement("failure")
+        test_case_ele.appendChild(failure_ele)
+        failure_ele.setAttribute("message", test_case.failure_message)
+        failure_ele.setAttribute("type", test_case.failure_type)
+        failure_ele.appendChild(doc.createTextNode(test_case.stack_trace))
+    return write_xml_element(test_case_ele, "\t\t")
+
+
+def write_xml_element(element: minidom.Element, indent: str) -> str:
+    """
+        Write the element in the same format as the whole document written by minidom.Document.writexml(f, "\t", "\t", "\n").
+    """
+    buffer = io.StringIO()
+    element.writexml(buffer, indent, "\t", "\n")
+    return buffer.getvalue()
+
+
+class HtmlReportWriter(TestListener):
+    """
+        Write the shards of html report as soon as the test classes are finished, only the index is written by generate_html_report().
+        If live is True, the index is also updated during the run, so the finished test classes can be browsed.
+    """
+    # the min interval (in seconds) between the updates of index during the run
+    live_index_interval = 5
+
+    def __init__(self, report_dir: str, live: bool = False):
+        self.report_dir = report_dir
+        self.live = live
+        # test class -> the test class dict without the content of shard
+        self.__test_class_dicts = {}
+        self.__shard_count = 0
+        self.__lock = threading.Lock()
+        # for live index
+        self.__last_index_time = 0
+        self.__index_timer = None
+        self.__index_lock = threading.Lock()
+        self.__finished = False
+
+    def on_test_suite_start(self, test_suite: TestSuite):
+        if self.live:
+            self.__update_index(test_suite)
+
+    def on_test_suite_finish(self, test_suite: TestSuite):
+        # the final index is written by generate_html_report()
+        with self.__index_lock:
+            self.__finished = True
+            if self.__index_timer:
+                self.__index_timer.cancel()
+
+    def on_test_class_finish(self, test_class: TestClass):
+        self.write_test_class_shard(test_class)
+        if self.live:
+            with self.__index_lock:
+                # the pending update will include this test class
+                if self.__index_timer is None and not self.__finished:
+                    delay = max(0.0, self.__last_index_time + self.live_index_interval - time.time())
+                    self.__index_timer = threading.Timer(delay, self.__update_index, (test_class.test_suite,))
+                    self.__index_timer.daemon = True
+                    self.__index_timer.start()
+
+    def write_test_class_shard(self, test_class: TestClass) -> dict:
+        """
+            Write the shard of the test class if it is not written yet.
+
+        :return: the test class dict without the content of shard.
+        """
+        with self.__lock:
+            if test_class in self.__test_class_dicts:
+                return self.__test_class_dicts[test_class]
+            shard_path = "data/%s.js" % self.__shard_count
+            self.__shard_count += 1
+        test_class_dict = _write_test_class_shard(self.report_dir, shard_path, test_class)
+        with self.__lock:
+            self.__test_class_dicts[test_class] = test_class_dict
+        return test_class_dict
+
+    def get_test_class_dicts(self, test_suite: TestSuite) -> List[dict]:
+        with self.__lock:
+            return [self.__test_class_dicts[test_class] for test_class in test_suite.test_classes if test_class in self.__test_class_dicts]
+
+    def __update_index(self, test_suite: TestSuite):
+        with self.__index_lock:
+            self.__index_timer = None
+            if self.__finished:
+                return
+            self.__last_index_time = time.time()
+            try:
+                _write_index_page(self.report_dir, test_suite, self.get_test_class_dicts(test_suite))
+            except Exception:
+                pconsole.write_line("Failed to update html report.\n%s" % traceback.format_exc())
+
+
+def save_image(image: bytes) -> str:
+    """
+        Save the png image to the images dir of html report.
+        The images are named by their content, so the identical images are saved only once.
+
+    :return: the path of the image (relative to html report dir).
+    """
+    image_path = "images/%s.png" % hashlib.sha1(image).hexdigest()
+    write_image(image_path, image)
+    return image_path
+
+
+def write_image(image_path: str, image: bytes):
+    """
+        Write the png image to the given path (relative to html report dir) if it does not exist.
+    """
+    image_full_path = os.path.join(config.get_option("report_dir"), image_path)
+    if not os.path.exists(image_full_path):
+        make_dirs(os.path.dirname(image_full_path))
+        # the same image might be saved by other test executors at the same time, replace it at once
+        temp_file_path = "%s.%s.tmp" % (image_full_path, uuid.uuid4().hex)
+        with open(temp_file_path, mode="wb") as f:
+            f.write(image)
+        os.replace(temp_file_path, image_full_path)
+
+
+def init_html_report_dir(report_dir: str):
+    """
+        Clean the old html report and copy the js and css files, it should be called before the test suite starts,
+        since the images are saved to html report dir during the run.
+    """
     if os.path.exists(report_dir):
         pconsole.write_line("Cleaning old html report...")
         remove_tree(report_dir, remove_root=False)
     else:
         make_dirs(report_dir)
-
-    html_template_dir = os.path.join(current_dir, "htmltemplate")
+    make_dirs(os.path.join(report_dir, "data"))
+    make_dirs(os.path.join(report_dir, "images"))
 
     # copy js and css files to report dir
+    html_template_dir = os.path.join(current_dir, "htmltemplate")
     for fn in os.listdir(html_template_dir):
         file_full_path = os.path.join(html_template_dir, fn)
         _, file_ext = os.path.splitext(fn)
         if os.path.isfile(file_full_path) and file_ext in [".js", ".css"]:
             shutil.copy(file_full_path, report_dir)
 
-    # copy screenshots from temp dir to report dir
-    temp_dir = config.get_option("temp")
-    for fn in os.listdir(temp_dir):
-        file_full_path = os.path.join(temp_dir, fn)
-        _, file_ext = os.path.splitext(fn)
-        if os.path.isfile(file_full_path) and file_ext == ".png":
-            shutil.copy(file_full_path, report_dir)
 
-    with open(os.path.join(html_template_dir, "index.html"), encoding="utf-8") as f:
+def generate_html_report(report_dir: str, html_report_writer: HtmlReportWriter = None):
+    """
+        Generate the html report in the report dir initialized by init_html_report_dir().
+    """
+    pconsole.write_line("Generating html report...")
+
+    if html_report_writer is None:
+        html_report_writer = HtmlReportWriter(report_dir)
+
+    try:
+        # the shards of finished test classes are written by HtmlReportWriter, write the rest
+        for test_class in default_test_suite.test_classes:
+            html_report_writer.write_test_class_shard(test_class)
+
+        _write_index_page(report_dir, default_test_suite, html_report_writer.get_test_class_dicts(default_test_suite))
+        pconsole.write_line("html report is generated at %s" % os.path.abspath(report_dir))
+    except Exception as e:
+        pconsole.write_line("Failed to generate html report.\n%s" % traceback.format_exc())
+
+
+def _write_index_page(report_dir: str, test_suite: TestSuite, test_class_dicts: List[dict]):
+    with open(os.path.join(current_dir, "htmltemplate", "index.html"), encoding="utf-8") as f:
         index_page_template = f.read()
 
     current_time = datetime.now()
     system_info = "%s / Python %s / %s" % (platform.node(), platform.python_version(), platform.platform())
-    test_suite_json = json.dumps(_get_test_suite_dict(default_test_suite))
+    test_suite_json = json.dumps(_get_test_suite_dict(test_suite, test_class_dicts))
     index_page_content = index_page_template.format(version=__version__, current_time=current_time, system_info=system_info,
                                                     test_suite_json=test_suite_json)
 
-    f = open(os.path.join(report_dir, "index.html"), mode="w", encoding="utf-8")
-    try:
+    # replace the index at once, so the html report is always browsable
+    index_page_path = os.path.join(report_dir, "index.html")
+    with open(index_page_path + ".tmp", mode="w", encoding="utf-8") as f:
         f.write(index_page_content)
-        pconsole.write_line("html report is generated at %s" % os.path.abspath(report_dir))
-    except Exception as e:
-        pconsole.write_line("Failed to generate html report.\n%s" % traceback.format_exc())
-    finally:
-        f.close()
+    os.replace(index_page_path + ".tmp", index_page_path)
+
+
+def _write_test_class_shard(report_dir: str, shard_path: str, test_class: TestClass) -> dict:
+    """
+        Write the test groups, test cases and test fixtures of the test class to the shard.
+
+    :return: the test class dict without the content of shard.
+    """
+    test_class_dict = _get_test_class_dict(test_class)
+    test_class_detail_dict = {}
+    for key in ["testGroups", "testCases", "beforeClass", "afterClass"]:
+        if key in test_class_dict:
+            test_class_detail_dict[key] = test_class_dict.pop(key)
+    test_class_dict["shard"] = shard_path
+    with open(os.path.join(report_dir, shard_path), mode="w", encoding="utf-8") as f:
+        f.write("onTestClassLoaded(%s, %s);\n" % (json.dumps(shard_path), json.dumps(test_class_detail_dict)))
+    return test_class_dict
 
 
-def _get_test_suite_dict(test_suite: TestSuite):
+def _get_test_suite_dict(test_suite: TestSuite, test_class_dicts: List[dict]):
+    if test_suite.end_time is None:
+        # the test suite is running (--live-report)
+        elapsed_time = 0 if test_suite.start_time is None else (datetime.now() - test_suite.start_time).total_seconds()
+    else:
+        elapsed_time = test_suite.elapsed_time
     test_suite_dict = {
         "name": escape_html(test_suite.name),
         "fullName": escape_html(test_suite.full_name),
         "type": "suite",
-        "testModules": _get_test_module_dicts(test_suite.test_classes),
+        "testModules": _get_test_module_dicts(test_suite, test_class_dicts),
         "startTime": str(test_suite.start_time),
         "endTime": str(test_suite.end_time),
-        "elapsedTime": test_suite.elapsed_time,
+        "elapsedTime": elapsed_time,
         "total": test_suite.status_count.total,
         "passed": test_suite.status_count.passed,
         "failed": test_suite.status_count.failed,
         "skipped": test_suite.status_count.skipped
     }
-    if not test_suite.before_suite.is_empty:
+    if not test_suite.before_suite.is_empty and test_suite.before_suite.end_time is not None:
         test_suite_dict["beforeSuite"] = _get_test_fixture_dict(test_suite.before_suite)
-    if not test_suite.after_suite.is_empty:
+    if not test_suite.after_suite.is_empty and test_suite.after_suite.end_time is not None:
         test_suite_dict["afterSuite"] = _get_test_fixture_dict(test_suite.after_suite)
     return test_suite_dict
 
 
-def _get_test_module_dicts(test_classes: List[TestClass]):
+def _get_test_module_dicts(test_suite: TestSuite, test_class_dicts: List[dict]):
     root_test_module_dict = {
         "name": "root",
         "testModules": []
@@ -140,31 +346,27 @@ def _get_test_module_dicts(test_classes: List[TestClass]):
         for module in modules:
             if module_full_name == module["fullName"]:
                 return module
+        status_count = test_suite.get_module_status_count(module_full_name)
         new_module = {
             "name": module_full_name.split(".")[-1],
             "fullName": module_full_name,
             "type": "module",
             "testModules": [],
             "testClasses": [],
-            "total": 0,
-            "passed": 0,
-            "failed": 0,
-            "skipped": 0
+            "total": status_count.total,
+            "passed": status_count.passed,
+            "failed": status_count.failed,
+            "skipped": status_count.skipped
         }
         modules.append(new_module)
         modules.sort(key=lambda m: m["name"])
         return new_module
 
-    for test_class_dict in [_get_test_class_dict(test_class) for test_class in test_classes]:
+    for test_class_dict in test_class_dicts:
         current_test_module_dict = root_test_module_dict
         splitted_full_name = test_class_dict["fullName"].split(".")[:-1]
         for i in range(len(splitted_full_name)):
-            test_module_dict = get_or_new_module(current_test_module_dict["testModules"], ".".join(splitted_full_name[:i + 1]))
-            test_module_dict["total"] += test_class_dict["total"]
-            test_module_dict["passed"] += test_class_dict["passed"]
-            test_module_dict["failed"] += test_class_dict["failed"]
-            test_module_dict["skipped"] += test_class_dict["skipped"]
-            current_test_module_dict = test_module_dict
+            current_test_module_dict = get_or_new_module(current_test_module_dict["testModules"], ".".join(splitted_full_name[:i + 1]))
         current_test_module_dict["testClasses"].append(test_class_dict)
         current_test_module_dict["testClasses"].sort(key=lambda c: c["name"])
     return root_test_module_dict["testModules"]
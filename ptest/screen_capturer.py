@@ -1,6 +1,14 @@
+import hashlib
+import multiprocessing
 import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
 from io import BytesIO
 
+from typing import Callable, List
+
 from . import config
 from .exception import ScreenshotError
 
@@ -21,6 +29,11 @@ from struct import pack
 from platform import system
 from zlib import compress, crc32
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 if system() == 'Darwin':
     try:
         import Quartz
@@ -48,55 +61,103 @@ elif system() == 'Windows':
 
 
 class MSS(object):
+    # whether get_pixels() returns the raw RGB pixels, they can be encoded in other threads
+    raw_pixels = True
+
     def enum_display_monitors(self, screen=0):
         raise NotImplementedError('MSS: subclasses need to implement this!')
 
     def get_pixels(self, monitor):
         raise NotImplementedError('MSS: subclasses need to implement this!')
 
-    def save(self, output, screen=0):
-        for i, monitor in enumerate(self.enum_display_monitors(screen)):
-            if screen <= 0 or (screen > 0 and i + 1 == screen):
-                self.save_img(data=self.get_pixels(monitor),
-                              width=monitor[b'width'],
-                              height=monitor[b'height'],
-                              output=output)
-
-    def save_img(self, data, width, height, output):
-        zcrc32 = crc32
-        zcompr = compress
-        len_sl = width * 3
-        scanlines = b''.join(
-            [pack(b'>B', 0) + data[y * len_sl:y * len_sl + len_sl]
-             for y in range(height)])
+    def grab(self, screen=0):
+        return [(self.get_pixels(monitor), monitor[b'width'], monitor[b'height'])
+                for i, monitor in enumerate(self.enum_display_monitors(screen))
+                if screen <= 0 or (screen > 0 and i + 1 == screen)]
+
+    def save(self, output, screen=0, compression_level=9, downscale=1):
+        for data, width, height in self.grab(screen):
+            self.save_img(data=data,
+                          width=width,
+                          height=height,
+                          output=output,
+                          compression_level=compression_level,
+                          downscale=downscale)
+
+    def save_img(self, data, width, height, output, compression_level=9, downscale=1):
+        if downscale > 1:
+            data, width, height = downscale_pixels(data, width, height, downscale)
+        scanlines = get_scanlines(data, width, height)
 
         magic = pack(b'>8B', 137, 80, 78, 71, 13, 10, 26, 10)
 
         # Header: size, marker, data, CRC32
-        ihdr = [b'', b'IHDR', b'', b'']
-        ihdr[2] = pack(b'>2I5B', width, height, 8, 2, 0, 0, 0)
-        ihdr[3] = pack(b'>I', zcrc32(b''.join(ihdr[1:3])) & 0xffffffff)
-        ihdr[0] = pack(b'>I', len(ihdr[2]))
+        ihdr_data = pack(b'>2I5B', width, height, 8, 2, 0, 0, 0)
+        ihdr = pack(b'>I', len(ihdr_data)) + b'IHDR' + ihdr_data + pack(b'>I', crc32(ihdr_data, crc32(b'IHDR')) & 0xffffffff)
 
         # Data: size, marker, data, CRC32
-        idat = [b'', b'IDAT', b'', b'']
-        idat[2] = zcompr(scanlines, 9)
-        idat[3] = pack(b'>I', zcrc32(b''.join(idat[1:3])) & 0xffffffff)
-        idat[0] = pack(b'>I', len(idat[2]))
+        idat_data = compress(scanlines, compression_level)
+        del scanlines
 
         # Footer: size, marker, None, CRC32
-        iend = [b'', b'IEND', b'', b'']
-        iend[3] = pack(b'>I', zcrc32(iend[1]) & 0xffffffff)
-        iend[0] = pack(b'>I', len(iend[2]))
+        iend = pack(b'>I', 0) + b'IEND' + pack(b'>I', crc32(b'IEND') & 0xffffffff)
 
         try:
-            output.write(magic + b''.join(ihdr) + b''.join(idat) + b''.join(iend))
+            output.write(magic + ihdr)
+            # the compressed data is not copied into a whole png
+            output.write(pack(b'>I', len(idat_data)) + b'IDAT')
+            output.write(idat_data)
+            output.write(pack(b'>I', crc32(idat_data, crc32(b'IDAT')) & 0xffffffff) + iend)
         except:
             err = 'MSS: error writing data to "{0}".'.format(output)
             raise ScreenshotError(err)
 
 
+def get_scanlines(data, width, height):
+    """
+        Get the png scanlines of the RGB pixels, every scanline starts with the filter type 0 (None).
+    """
+    len_sl = width * 3
+    if numpy is not None:
+        scanlines = numpy.zeros((height, len_sl + 1), dtype=numpy.uint8)
+        scanlines[:, 1:] = numpy.frombuffer(data, dtype=numpy.uint8, count=height * len_sl).reshape(height, len_sl)
+        return scanlines
+
+    pixels = memoryview(data).cast('B')
+    scanlines = bytearray(height * (len_sl + 1))
+    for y in range(height):
+        start = y * (len_sl + 1) + 1
+        scanlines[start:start + len_sl] = pixels[y * len_sl:y * len_sl + len_sl]
+    return scanlines
+
+
+def downscale_pixels(data, width, height, factor):
+    """
+        Downscale the RGB pixels by picking one pixel of every factor x factor pixels.
+
+    :return: the downscaled pixels, width and height.
+    """
+    len_sl = width * 3
+    scaled_width, scaled_height = (width + factor - 1) // factor, (height + factor - 1) // factor
+    if numpy is not None:
+        pixels = numpy.frombuffer(data, dtype=numpy.uint8, count=height * len_sl).reshape(height, width, 3)
+        return numpy.ascontiguousarray(pixels[::factor, ::factor]), scaled_width, scaled_height
+
+    pixels = memoryview(data).cast('B')
+    scaled_len_sl = scaled_width * 3
+    scaled_pixels = bytearray(scaled_height * scaled_len_sl)
+    for scaled_y in range(scaled_height):
+        y = scaled_y * factor
+        row = pixels[y * len_sl:y * len_sl + len_sl].tobytes()
+        start = scaled_y * scaled_len_sl
+        for channel in range(3):
+            scaled_pixels[start + channel:start + scaled_len_sl:3] = row[channel::3 * factor]
+    return scaled_pixels, scaled_width, scaled_height
+
+
 class MSSMac(MSS):
+    raw_pixels = False
+
     def enum_display_monitors(self, screen=0):
         if screen == -1:
             rect = Quartz.CGRectInfinite
@@ -136,7 +197,7 @@ class MSSMac(MSS):
             raise ScreenshotError('MSS: CGWindowListCreateImage() failed.')
         return self.image
 
-    def save_img(self, data, width, height, output):
+    def save_img(self, data, width, height, output, compression_level=9, downscale=1):
         cf_data = Quartz.CFDataCreateMutable(Quartz.kCFAllocatorDefault, 0)
         dest = Quartz.CGImageDestinationCreateWithData(cf_data, kUTTypePNG, 1, None)
         if not dest:
@@ -267,69 +328,368 @@ def mss(*args, **kwargs):
     return mss_class(*args, **kwargs)
 
 
+# ----------------------------------------------------------------------
+# ------------- [ encode desktop screenshot in background ] ------------
+# ----------------------------------------------------------------------
+class ScreenshotEncoder(object):
+    """
+        Encode the grabbed desktop screenshots to png and save them in a pool of background threads,
+        so the test executors only pay for the grab.
+    """
+
+    def __init__(self, workers: int, queue_size: int, compression_level: int, downscale: int):
+        self.workers = workers
+        self.compression_level = compression_level
+        self.downscale = downscale
+        self.__thread_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ptest-screenshot-encoder") if workers > 0 else None
+        # the raw pixels are large, the test executors wait for free space if too many of them are waiting for encoding
+        self.__free_slots = threading.Semaphore(workers + queue_size)
+        self.__pending_images = {}  # image path -> future
+        self.__saved_callbacks = {}  # image path -> callbacks called after it is saved or failed
+        self.__lock = threading.Lock()
+
+    def save(self, mss_instance: MSS, screen=0) -> str:
+        """
+            Grab the screen and save it to the images dir of html report.
+
+        :return: the path of the image (relative to html report dir), it might be saved later, see wait().
+        """
+        from .reporter import save_image
+        if self.__thread_pool is None or not mss_instance.raw_pixels:
+            output = BytesIO()
+            mss_instance.save(output=output, screen=screen, compression_level=self.compression_level, downscale=self.downscale)
+            return save_image(output.getvalue())
+
+        images = mss_instance.grab(screen)
+        # the png is not encoded yet, so the screenshots are named by their pixels
+        sha1 = hashlib.sha1(b"%d:%d" % (self.compression_level, self.downscale))
+        for data, width, height in images:
+            sha1.update(b"%dx%d" % (width, height))
+            sha1.update(data)
+        image_path = "images/%s.png" % sha1.hexdigest()
+
+        with self.__lock:
+            if image_path in self.__pending_images:
+                return image_path
+        if os.path.exists(os.path.join(config.get_option("report_dir"), image_path)):
+            return image_path
+
+        self.__free_slots.acquire()
+        with self.__lock:
+            # it might be submitted by other test executors while waiting for free space
+            if image_path in self.__pending_images:
+                self.__free_slots.release()
+                return image_path
+            self.__pending_images[image_path] = self.__thread_pool.submit(self.__encode, mss_instance, images, image_path)
+            self.__saved_callbacks[image_path] = []
+        return image_path
+
+    def add_saved_callback(self, image_path: str, callback: Callable[[bool], None]):
+        """
+            Call the callback with whether the image returned by save() is saved,
+            it is called at once if the image is not being encoded.
+        """
+        with self.__lock:
+            if image_path in self.__saved_callbacks:
+                self.__saved_callbacks[image_path].append(callback)
+                return
+        callback(os.path.exists(os.path.join(config.get_option("report_dir"), image_path)))
+
+    def wait(self):
+        """
+            Wait for the pending screenshots to be saved.
+        """
+        with self.__lock:
+            futures = list(self.__pending_images.values())
+        wait(futures)
+
+    def __encode(self, mss_instance: MSS, images: list, image_path: str):
+        from .plogger import pconsole_err
+        from .reporter import write_image
+        saved = False
+        try:
+            output = BytesIO()
+            for data, width, height in images:
+                mss_instance.save_img(data=data, width=width, height=height, output=output,
+                                      compression_level=self.compression_level, downscale=self.downscale)
+            write_image(image_path, output.getvalue())
+            saved = True
+        except Exception:
+            pconsole_err.write_line("Failed to save the screenshot %s:\n%s" % (image_path, traceback.format_exc()))
+        finally:
+            # the callbacks are called before the future is done, so they are finished when wait() returns
+            with self.__lock:
+                del self.__pending_images[image_path]
+                callbacks = self.__saved_callbacks.pop(image_path)
+            self.__free_slots.release()
+            for callback in callbacks:
+                callback(saved)
+
+
+_screenshot_encoder = None
+_screenshot_encoder_lock = threading.Lock()
+
+
+def get_screenshot_encoder() -> ScreenshotEncoder:
+    global _screenshot_encoder
+    with _screenshot_encoder_lock:
+        if _screenshot_encoder is None:
+            _screenshot_encoder = ScreenshotEncoder(int(config.get_option("screenshot_encoders")),
+                                                    int(config.get_option("screenshot_queue_size")),
+                                                    int(config.get_option("screenshot_compression_level")),
+                                                    int(config.get_option("screenshot_downscale")))
+        return _screenshot_encoder
+
+
+def wait_for_screenshots():
+    """
+        Wait for the desktop screenshots being encoded in background, they should be saved before the test suite finishes.
+    """
+    if _screenshot_encoder is not None:
+        _screenshot_encoder.wait()
+
+
+# ----------------------------------------------------------------------
+# ------------- [ share and limit screenshots of a run ] ---------------
+# ----------------------------------------------------------------------
+class ScreenshotCounter(object):
+    """
+        Count the screenshots of a run and limit the taken ones by --max-screenshots,
+        the counts are shared with the worker processes on this machine.
+    """
+
+    def __init__(self, counts=None):
+        # the counts of taken, reused, skipped, failed and being taken screenshots
+        self.counts = multiprocessing.get_context("spawn").Array("i", 5) if counts is None else counts
+
+    @property
+    def taken(self) -> int:
+        return self.counts[0]
+
+    @property
+    def reused(self) -> int:
+        return self.counts[1]
+
+    @property
+    def skipped(self) -> int:
+        return self.counts[2]
+
+    @property
+    def failed(self) -> int:
+        return self.counts[3]
+
+    def acquire(self) -> bool:
+        """
+            Reserve a screenshot to be taken, it should be released by release() after it is taken.
+
+        :return: False if the max number of screenshots is reached, the screenshot should be skipped.
+        """
+        max_screenshots = int(config.get_option("max_screenshots"))
+        with self.counts.get_lock():
+            # the screenshots being taken are reserved, so the concurrent ones do not exceed the max number
+            if 0 < max_screenshots <= self.counts[0] + self.counts[4]:
+                self.counts[2] += 1
+                return False
+            self.counts[4] += 1
+            return True
+
+    def release(self, taken: bool):
+        """
+            Release the reserved screenshot, only the taken one is counted as taken (and limited by --max-screenshots).
+        """
+        with self.counts.get_lock():
+            self.counts[4] -= 1
+            if taken:
+                self.counts[0] += 1
+            else:
+                self.counts[3] += 1
+
+    def reuse(self):
+        with self.counts.get_lock():
+            self.counts[1] += 1
+
+
+class DesktopScreenshotCache(object):
+    """
+        Share the desktop screenshot among the test executors, the requests within the interval reuse the last one.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.__lock = threading.Lock()
+        self.__last_screenshot = None
+        self.__last_time = None
+
+    def get(self, take_screenshot: Callable[[], dict]) -> dict:
+        # the requests wait for the capture of others, so the concurrent ones reuse one capture
+        with self.__lock:
+            now = time.monotonic()
+            # the path is removed if the screenshot fails to be saved in background, see take_desktop_screenshot()
+            if self.__last_screenshot is not None and "path" in self.__last_screenshot and now - self.__last_time <= self.interval:
+                screenshot = dict(self.__last_screenshot)
+
+                def reuse(saved: bool):
+                    _check_desktop_screenshot_saved(screenshot, saved)
+                    if saved:
+                        get_screenshot_counter().reuse()
+
+                if "path" in screenshot:
+                    get_screenshot_encoder().add_saved_callback(screenshot["path"], reuse)
+                return screenshot
+            screenshot = take_screenshot()
+            if "path" in screenshot:
+                self.__last_screenshot = screenshot
+                self.__last_time = now
+            return screenshot
+
+
+_screenshot_counter = None
+_desktop_screenshot_cache = None
+_screenshot_cache_lock = threading.Lock()
+
+
+def init_screenshot_counter(counts):
+    """
+        Share the screenshot counts of the main process, it is called in the worker processes.
+    """
+    global _screenshot_counter
+    with _screenshot_cache_lock:
+        _screenshot_counter = ScreenshotCounter(counts)
+
+
+def get_screenshot_counter() -> ScreenshotCounter:
+    global _screenshot_counter
+    with _screenshot_cache_lock:
+        if _screenshot_counter is None:
+            _screenshot_counter = ScreenshotCounter()
+        return _screenshot_counter
+
+
+def get_desktop_screenshot_cache() -> DesktopScreenshotCache:
+    global _desktop_screenshot_cache
+    with _screenshot_cache_lock:
+        if _desktop_screenshot_cache is None:
+            _desktop_screenshot_cache = DesktopScreenshotCache(float(config.get_option("screenshot_interval")))
+        return _desktop_screenshot_cache
+
+
 # ----------------------------------------------------------------------
 # ----------- [ take screenshot for desktop & webdriver ] -------------
 # ----------------------------------------------------------------------
-def take_screenshots(path_prefix: str):
-    screenshots = []
+_SKIPPED_SCREENSHOT_ERROR = "The screenshot is skipped, the max number of screenshots (%s) is reached."
+_FAILED_SCREENSHOT_ERROR = "Failed to save the screenshot."
+
+
+def _check_desktop_screenshot_saved(screenshot: dict, saved: bool):
+    # the desktop screenshot is saved in background, it is marked as failed if the encoding fails
+    if not saved:
+        screenshot.pop("path", None)
+        screenshot["error"] = _FAILED_SCREENSHOT_ERROR
 
+
+def take_desktop_screenshot() -> dict:
     screenshot = {
-        "source": "Desktop",
-        "path": "%s-screenshot-0.png" % path_prefix
+        "source": "Desktop"
     }
 
     if system() == 'Darwin' and not pyobjc_installed:
         screenshot["error"] = "The package pyobjc is necessary for taking screenshot of desktop, please install it."
+    elif not get_screenshot_counter().acquire():
+        screenshot["error"] = _SKIPPED_SCREENSHOT_ERROR % config.get_option("max_screenshots")
     else:
         try:
-            output = BytesIO()
-            mss().save(output=output, screen=-1)  # -1 means all monitors
-            value = output.getvalue()
-            with open(os.path.join(config.get_option("temp"), screenshot["path"]), mode="wb") as f:
-                f.write(value)
+            screenshot["path"] = get_screenshot_encoder().save(mss(), screen=-1)  # -1 means all monitors
+        except Exception as e:
+            screenshot["error"] = str(e).strip() or "\n".join([str(arg) for arg in e.args])
+            get_screenshot_counter().release(False)
+        else:
+            # it is counted as taken after it is saved, so the failed ones do not count toward --max-screenshots
+            def release(saved: bool):
+                _check_desktop_screenshot_saved(screenshot, saved)
+                get_screenshot_counter().release(saved)
+
+            get_screenshot_encoder().add_saved_callback(screenshot["path"], release)
+
+    return screenshot
+
+
+def take_web_driver_screenshot(web_driver) -> dict:
+    from .reporter import save_image
+    screenshot = {
+        "source": "Web Driver"
+    }
+
+    try:
+        screenshot["alert"] = web_driver.switch_to.alert.text
+    except Exception as e:
+        pass
+
+    while True:
+        try:
+            web_driver.switch_to.alert.dismiss()
+        except Exception as e:
+            break
+
+    try:
+        screenshot["url"] = web_driver.current_url
+    except Exception as e:
+        pass
+
+    try:
+        screenshot["title"] = web_driver.title
+    except Exception as e:
+        pass
+
+    if not get_screenshot_counter().acquire():
+        screenshot["error"] = _SKIPPED_SCREENSHOT_ERROR % config.get_option("max_screenshots")
+    else:
+        try:
+            screenshot["path"] = save_image(web_driver.get_screenshot_as_png())
         except Exception as e:
             screenshot["error"] = str(e).strip() or "\n".join([str(arg) for arg in e.args])
+        get_screenshot_counter().release("path" in screenshot)
+
+    return screenshot
+
 
-    screenshots.append(screenshot)
+def take_web_driver_screenshots(web_drivers: list) -> List[dict]:
+    """
+        Take the screenshots of the web drivers concurrently,
+        the ones not finished in --web-driver-screenshot-timeout are given up, so a hung browser does not block the test.
+    """
+    timeout = float(config.get_option("web_driver_screenshot_timeout"))
+    screenshots = [None] * len(web_drivers)
+
+    def take(index, web_driver):
+        screenshots[index] = take_web_driver_screenshot(web_driver)
+
+    # the daemon threads of hung browsers are left behind, they do not block the exit of ptest
+    threads = []
+    for index, web_driver in enumerate(web_drivers):
+        thread = threading.Thread(target=take, args=(index, web_driver), name="ptest-web-driver-screenshot")
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+
+    deadline = time.monotonic() + timeout if timeout > 0 else None
+    for thread in threads:
+        thread.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+
+    # copy the result, the threads timed out might set it later
+    return [dict(screenshot) if screenshot is not None else {
+        "source": "Web Driver",
+        "error": "Timed out taking the screenshot of web driver after %s seconds." % config.get_option("web_driver_screenshot_timeout")
+    } for screenshot in screenshots]
+
+
+def take_screenshots():
+    screenshots = [get_desktop_screenshot_cache().get(take_desktop_screenshot)]
 
     from . import test_executor
     web_drivers = test_executor.current_executor().get_property("web_drivers")
 
     if web_drivers:
-        for index, web_driver in enumerate(web_drivers):
-            screenshot = {
-                "source": "Web Driver",
-                "path": "%s-screenshot-%s.png" % (path_prefix, index + 1)
-            }
-
-            try:
-                screenshot["alert"] = web_driver.switch_to.alert.text
-            except Exception as e:
-                pass
-
-            while True:
-                try:
-                    web_driver.switch_to.alert.dismiss()
-                except Exception as e:
-                    break
-
-            try:
-                screenshot["url"] = web_driver.current_url
-            except Exception as e:
-                pass
-
-            try:
-                screenshot["title"] = web_driver.title
-            except Exception as e:
-                pass
-
-            try:
-                value = web_driver.get_screenshot_as_png()
-                with open(os.path.join(config.get_option("temp"), screenshot["path"]), mode="wb") as f:
-                    f.write(value)
-            except Exception as e:
-                screenshot["error"] = str(e).strip() or "\n".join([str(arg) for arg in e.args])
-
-            screenshots.append(screenshot)
-
-    return screenshots
\ No newline at end of file
+        # the web drivers might be registered or quit during the capture
+        screenshots.extend(take_web_driver_screenshots(list(web_drivers)))
+
+    return screenshots
@@ -1,48 +1,254 @@
+import asyncio
+import heapq
 import threading
 import time
 import traceback
+from collections import deque
+from concurrent.futures import Future, wait
+from contextvars import ContextVar
 from copy import copy
 from datetime import datetime
 from functools import cmp_to_key
+from types import GeneratorType
 
-from typing import List
+from typing import List, Callable
 
+from . import config
 from .enumeration import TestCaseStatus, TestClassRunMode, TestFixtureStatus
 from .plistener import test_listeners
 from .plogger import preporter, pconsole, pconsole_err
+from .screen_capturer import wait_for_screenshots
 from .test_suite import AfterSuite, BeforeSuite, AfterClass, BeforeClass, BeforeGroup, AfterGroup, AfterMethod, BeforeMethod, Test, \
-    TestSuite, TestGroup, TestClass, TestCase, TestFixture
-from .util import call_function, kill_thread, format_thread_stack
+    TestSuite, TestGroup, TestClass, TestCase, TestCaseStream, TestFixture
+from .util import call_function, interrupt_thread, format_thread_stack, format_task_stack
+
+# the executor of current thread or asyncio task
+_current_executor = ContextVar("current_executor", default=None)
+
+
+class TestTimeoutSupervisor:
+    """
+        A single thread which keeps the deadlines of all running test fixtures in a heap,
+        and calls the timeout callback of a test fixture when its deadline is reached.
+    """
+
+    def __init__(self):
+        # heap of [deadline, sequence, callback], the callback is set to None when the deadline is cancelled
+        self.__deadlines = []
+        self.__sequence = 0
+        self.__condition = threading.Condition()
+        self.__shutdown = False
+        self.__thread = threading.Thread(target=self.__supervise, name="ptest-timeout-supervisor")
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def watch(self, timeout: float, callback: Callable) -> list:
+        """
+            Call the callback on the supervisor thread after the timeout (in seconds) unless it is cancelled.
+
+        :return: the deadline which can be cancelled by cancel().
+        """
+        with self.__condition:
+            self.__sequence += 1
+            deadline = [time.monotonic() + timeout, self.__sequence, callback]
+            heapq.heappush(self.__deadlines, deadline)
+            if self.__deadlines[0] is deadline:
+                # the earliest deadline is changed
+                self.__condition.notify()
+            return deadline
+
+    def cancel(self, deadline: list):
+        with self.__condition:
+            deadline[2] = None
+
+    def shutdown(self):
+        with self.__condition:
+            self.__shutdown = True
+            self.__condition.notify()
+        self.__thread.join()
+
+    def __supervise(self):
+        while True:
+            with self.__condition:
+                while True:
+                    if self.__shutdown:
+                        return
+                    # drop the cancelled deadlines, so they don't hold the test fixtures
+                    while self.__deadlines and self.__deadlines[0][2] is None:
+                        heapq.heappop(self.__deadlines)
+                    if not self.__deadlines:
+                        self.__condition.wait()
+                        continue
+                    remaining_time = self.__deadlines[0][0] - time.monotonic()
+                    if remaining_time <= 0:
+                        callback = heapq.heappop(self.__deadlines)[2]
+                        break
+                    self.__condition.wait(remaining_time)
+            try:
+                callback()
+            except Exception:
+                pconsole_err.write_line("The timeout callback %s raised exception:\n%s" % (callback, traceback.format_exc()))
 
 
-class TestExecutor(threading.Thread):
-    def __init__(self, parent_test_executor: "TestExecutor", workers: int = 0):
-        threading.Thread.__init__(self)
+class TestWorkerPool:
+    def __init__(self, workers: int):
+        self.workers = workers
+        # total time (in seconds) that the submitted tasks spent waiting for a free worker
+        self.waiting_time = 0.0
+        self.__tasks = deque()
+        self.__condition = threading.Condition()
+        self.__shutdown = False
+        self.__threads = []
+        self.__event_loop = None
+        self.__event_loop_thread = None
+        self.__timeout_supervisor = None
+
+    @property
+    def event_loop(self) -> asyncio.AbstractEventLoop:
+        """
+            The long-lived event loop shared by the coroutine test fixtures, it is started on first use.
+        """
+        with self.__condition:
+            if self.__event_loop is None:
+                self.__event_loop = asyncio.new_event_loop()
+                self.__event_loop_thread = threading.Thread(target=self.__run_event_loop, name="ptest-event-loop")
+                self.__event_loop_thread.daemon = True
+                self.__event_loop_thread.start()
+            return self.__event_loop
+
+    @property
+    def timeout_supervisor(self) -> TestTimeoutSupervisor:
+        """
+            The supervisor of the test fixtures with timeout, it is started on first use.
+        """
+        with self.__condition:
+            if self.__timeout_supervisor is None:
+                self.__timeout_supervisor = TestTimeoutSupervisor()
+            return self.__timeout_supervisor
+
+    def start(self):
+        self.__shutdown = False
+        for index in range(self.workers):
+            thread = threading.Thread(target=self.__work, name="ptest-worker-%s" % (index + 1))
+            thread.daemon = True
+            self.__threads.append(thread)
+            thread.start()
+
+    def submit(self, task: Callable):
+        with self.__condition:
+            self.__tasks.append((task, time.monotonic()))
+            # wake up one idle worker, the task is handed over to it immediately
+            self.__condition.notify()
+
+    def shutdown(self):
+        with self.__condition:
+            self.__shutdown = True
+            self.__condition.notify_all()
+        for thread in self.__threads:
+            thread.join()
+        self.__threads = []
+        if self.__event_loop is not None:
+            self.__event_loop.call_soon_threadsafe(self.__event_loop.stop)
+            self.__event_loop_thread.join()
+            self.__event_loop.close()
+            self.__event_loop = None
+        if self.__timeout_supervisor is not None:
+            self.__timeout_supervisor.shutdown()
+            self.__timeout_supervisor = None
+
+    def __run_event_loop(self):
+        asyncio.set_event_loop(self.__event_loop)
+        self.__event_loop.run_forever()
+
+    def __work(self):
+        while True:
+            with self.__condition:
+                while not self.__tasks:
+                    if self.__shutdown:
+                        return
+                    self.__condition.wait()
+                task, submit_time = self.__tasks.popleft()
+                self.waiting_time += time.monotonic() - submit_time
+            # the task returns the next task which should be run on the same worker
+            while task is not None:
+                task = task()
+
+
+class TestExecutor:
+    def __init__(self, parent_test_executor: "TestExecutor"):
         self.parent_test_executor = parent_test_executor
         self.__properties = {}
+        self.test_worker_pool = None
         if self.parent_test_executor:
+            self.test_worker_pool = self.parent_test_executor.test_worker_pool
             for key, value in self.parent_test_executor.get_properties().items():
                 if isinstance(value, (list, tuple, set, dict)):
                     self.__properties[key] = copy(value)
                 else:
                     self.__properties[key] = value
-        self.workers = workers
         self.lock = threading.RLock()
-        if self.workers == 0:
-            self.acquire_worker()
+        self.__steps = None
+        self.__running_children_count = 0
 
     def _run(self):
+        """
+            The body of this executor.
+            It can be a generator which yields the child executor (or a list of child executors to be run in parallel),
+            and it will be resumed after the yielded child executors are finished.
+            It can also yield a Future, then the worker is released and it will be resumed after the Future is done.
+        """
         pass
 
     def run(self):
+        """
+            Run this executor on current worker until it waits for its child executors or it is finished.
+
+        :return: the next task which should be run on the same worker.
+        """
+        token = _current_executor.set(self)
         try:
-            self._run()
+            if self.__steps is None:
+                steps = self._run()
+                self.__steps = steps if isinstance(steps, GeneratorType) else iter(())
+            child_test_executors = next(self.__steps, None)
+        except Exception:
+            pconsole_err.write_line("The test executor %s raised exception:\n%s" % (self, traceback.format_exc()))
+            child_test_executors = None
         finally:
-            self.release_worker()
+            _current_executor.reset(token)
 
-    def start_and_join(self):
-        self.start()
-        self.join()
+        if child_test_executors is None:
+            return self._finish()
+
+        if isinstance(child_test_executors, Future):
+            child_test_executors.add_done_callback(lambda future: self.test_worker_pool.submit(self.run))
+            return None
+
+        if isinstance(child_test_executors, TestExecutor):
+            child_test_executors = [child_test_executors]
+        else:
+            child_test_executors = list(child_test_executors)
+        if not child_test_executors:
+            return self.run
+
+        self.__running_children_count = len(child_test_executors)
+        for child_test_executor in child_test_executors[1:]:
+            self.test_worker_pool.submit(child_test_executor.run)
+        # current worker is handed over to the first child executor
+        return child_test_executors[0].run
+
+    def _finish(self):
+        if self.parent_test_executor:
+            return self.parent_test_executor._on_child_finish()
+        return None
+
+    def _on_child_finish(self):
+        with self.lock:
+            self.__running_children_count -= 1
+            if self.__running_children_count > 0:
+                return None
+        # the last finished child executor hands over its worker to this executor
+        return self.run
 
     def update_properties(self, properties):
         self.__properties.update(properties)
@@ -59,71 +265,41 @@ class TestExecutor(threading.Thread):
     def get_properties(self):
         return self.__properties
 
-    def allocate_worker(self, child_test_executor: "TestExecutor"):
-        with self.lock:
-            if self.workers > 0:
-                self.workers -= 1
-                child_test_executor.workers += 1
-                return True
-            else:
-                return False
-
-    def apply_worker(self):
-        if self.parent_test_executor:
-            with self.lock:
-                if self.parent_test_executor.allocate_worker(self):
-                    return True
-                else:
-                    if self.parent_test_executor.apply_worker():
-                        return self.parent_test_executor.allocate_worker(self)
-                    else:
-                        return False
-        else:
-            with self.lock:
-                return self.workers > 0
-
-    def acquire_worker(self):
-        while True:
-            if self.apply_worker():
-                return
-            else:
-                time.sleep(1)
-
-    def release_worker(self):
-        if self.parent_test_executor:
-            with self.parent_test_executor.lock:
-                self.parent_test_executor.workers += self.workers
-                self.workers = 0
-        else:
-            pass
-
 
 class TestSuiteExecutor(TestExecutor):
     def __init__(self, test_suite: TestSuite, workers: int):
-        TestExecutor.__init__(self, None, workers)
+        TestExecutor.__init__(self, None)
         self.test_suite = test_suite
+        self.test_worker_pool = TestWorkerPool(workers)
+        self.__finished = threading.Event()
+
+    def start_and_join(self):
+        self.test_worker_pool.start()
+        self.test_worker_pool.submit(self.run)
+        self.__finished.wait()
+        self.test_worker_pool.shutdown()
 
     def _run(self):
         before_suite_executor = TestFixtureExecutor(self, self.test_suite.before_suite)
         test_listeners.on_test_suite_start(self.test_suite)
         self.test_suite.start_time = datetime.now()
-        before_suite_executor.start_and_join()
-
-        test_class_run_group_executors = []
-
-        for test_class_run_group in self.test_suite.test_class_run_groups:
-            test_class_run_group_executor = TestClassRunGroupExecutor(self, test_class_run_group)
-            test_class_run_group_executors.append(test_class_run_group_executor)
-            test_class_run_group_executor.start()
+        yield before_suite_executor
 
-        for executor in test_class_run_group_executors:
-            executor.join()
+        yield from self._run_test_class_run_groups()
 
-        after_suite_executor = TestFixtureExecutor(self, self.test_suite.after_suite)
-        after_suite_executor.start_and_join()
+        yield TestFixtureExecutor(self, self.test_suite.after_suite)
+        # the desktop screenshots are encoded in background, they should be saved before the html report is generated
+        wait_for_screenshots()
         self.test_suite.end_time = datetime.now()
         test_listeners.on_test_suite_finish(self.test_suite)
 
+    def _run_test_class_run_groups(self):
+        yield [TestClassRunGroupExecutor(self, test_class_run_group) for test_class_run_group in self.test_suite.test_class_run_groups]
+
+    def _finish(self):
+        self.__finished.set()
+        return None
+
 
 class TestClassRunGroupExecutor(TestExecutor):
     def __init__(self, test_suite_executor: TestSuiteExecutor, test_class_run_group: List[TestClass]):
@@ -132,7 +308,7 @@ class TestClassRunGroupExecutor(TestExecutor):
 
     def _run(self):
         for test_class in self.test_class_run_group:
-            TestClassExecutor(self, test_class).start_and_join()
+            yield TestClassExecutor(self, test_class)
 
 
 class TestClassExecutor(TestExecutor):
@@ -141,29 +317,25 @@ class TestClassExecutor(TestExecutor):
         self.test_class = test_class
 
     def _run(self):
+        self.test_class.test_class_ref.__dict__.update(self.test_class.test_suite.before_suite_state)
         before_class_executor = TestFixtureExecutor(self, self.test_class.before_class)
         test_listeners.on_test_class_start(self.test_class)
         self.test_class.start_time = datetime.now()
-        before_class_executor.start_and_join()
+        yield before_class_executor
 
         if self.test_class.run_mode == TestClassRunMode.SingleLine:
             for test_group in self.test_class.test_groups:
-                TestGroupExecutor(self, test_group).start_and_join()
+                yield TestGroupExecutor(self, test_group)
         else:
-            test_group_executors = []
-
-            for test_group in self.test_class.test_groups:
-                test_group_executor = TestGroupExecutor(self, test_group)
-                test_group_executors.append(test_group_executor)
-                test_group_executor.start()
-
-            for executor in test_group_executors:
-                executor.join()
+            yield [TestGroupExecutor(self, test_group) for test_group in self.test_class.test_groups]
 
-        after_class_executor = TestFixtureExecutor(self, self.test_class.after_class)
-        after_class_executor.start_and_join()
+        yield TestFixtureExecutor(self, self.test_class.after_class)
+        # the listeners (e.g. html report) read the logs, the failed desktop screenshots are marked in them after encoding
+        wait_for_screenshots()
         self.test_class.end_time = datetime.now()
         test_listeners.on_test_class_finish(self.test_class)
+        if config.get_option("release_test_instances"):
+            self.test_class.compact()
 
 
 class TestGroupExecutor(TestExecutor):
@@ -172,29 +344,62 @@ class TestGroupExecutor(TestExecutor):
         self.test_group = test_group
 
     def _run(self):
+        self.test_group.test_class_ref.__dict__.update(self.test_group.test_suite.before_suite_state)
+        self.test_group.test_class_ref.__dict__.update(self.test_group.test_class.before_class_state)
         before_group_executor = TestFixtureExecutor(self, self.test_group.before_group)
         test_listeners.on_test_group_start(self.test_group)
         self.test_group.start_time = datetime.now()
-        before_group_executor.start_and_join()
+        yield before_group_executor
 
         if self.test_group.test_class.run_mode == TestClassRunMode.SingleLine:
             for test_case in self.test_group.test_cases:
-                TestCaseExecutor(self, test_case).start_and_join()
+                yield TestCaseExecutor(self, test_case)
+            for test_case_stream in self.test_group.test_case_streams:
+                yield TestCaseStreamExecutor(self, test_case_stream)
         else:
-            test_case_executors = []
+            # every worker can take the test cases from the streaming data provider
+            yield [TestCaseExecutor(self, test_case) for test_case in self.test_group.test_cases] + \
+                  [TestCaseStreamExecutor(self, test_case_stream) for test_case_stream in self.test_group.test_case_streams
+                   for _ in range(self.test_worker_pool.workers)]
 
-            for test_case in self.test_group.test_cases:
-                test_case_executor = TestCaseExecutor(self, test_case)
-                test_case_executors.append(test_case_executor)
-                test_case_executor.start()
-
-            for executor in test_case_executors:
-                executor.join()
-
-        after_group_executor = TestFixtureExecutor(self, self.test_group.after_group)
-        after_group_executor.start_and_join()
+        yield TestFixtureExecutor(self, self.test_group.after_group)
         self.test_group.end_time = datetime.now()
         test_listeners.on_test_group_finish(self.test_group)
+        if config.get_option("release_test_instances"):
+            self.test_group.compact()
+
+
+class TestCaseStreamExecutor(TestExecutor):
+    def __init__(self, test_group_executor: TestGroupExecutor, test_case_stream: TestCaseStream):
+        TestExecutor.__init__(self, test_group_executor)
+        self.test_case_stream = test_case_stream
+
+    def _run(self):
+        while True:
+            try:
+                test_case = self.test_case_stream.next_test_case()
+            except Exception as e:
+                self.__fail_data_provider(e.__class__.__name__, traceback.format_exc())
+                return
+            if test_case is None:
+                return
+            yield TestCaseExecutor(self, test_case)
+            # only the result of finished test case is kept
+            test_case.compact()
+
+    def __fail_data_provider(self, failure_type: str, stack_trace: str):
+        # the error is reported as a failed test case, so it is shown in the test reports
+        pconsole_err.write_line("Failed to read the data provider of %s:\n%s" % (self.test_case_stream.full_name, stack_trace))
+        test_case = self.test_case_stream.add_data_provider_error_test_case()
+        test_listeners.on_test_case_start(test_case)
+        test_case.start_time = test_case.end_time = datetime.now()
+        test_case.test.start_time = test_case.test.end_time = test_case.start_time
+        test_case.test.status = TestFixtureStatus.FAILED
+        test_case.test.failure_message = "Failed to read the data provider."
+        test_case.test.failure_type = failure_type
+        test_case.test.stack_trace = stack_trace
+        pconsole.write_line("%s%s|FAIL|" % (test_case.full_name, "-" * (100 - len(test_case.full_name) - 6)))
+        test_listeners.on_test_case_finish(test_case)
 
 
 class TestCaseExecutor(TestExecutor):
@@ -203,13 +408,16 @@ class TestCaseExecutor(TestExecutor):
         self.test_case = test_case
 
     def _run(self):
+        test_class_ref = self.test_case.test_case_ref.__self__
+        test_class_ref.__dict__.update(self.test_case.test_suite.before_suite_state)
+        test_class_ref.__dict__.update(self.test_case.test_class.before_class_state)
+        test_class_ref.__dict__.update(self.test_case.test_group.before_group_state)
         before_method_executor = TestFixtureExecutor(self, self.test_case.before_method)
         test_listeners.on_test_case_start(self.test_case)
         self.test_case.start_time = datetime.now()
-        before_method_executor.start_and_join()
+        yield before_method_executor
 
-        test_executor = TestFixtureExecutor(self, self.test_case.test)
-        test_executor.start_and_join()
+        yield TestFixtureExecutor(self, self.test_case.test)
 
         logger_filler = "-" * (100 - len(self.test_case.full_name) - 6)
         if self.test_case.status == TestCaseStatus.PASSED:
@@ -219,10 +427,11 @@ class TestCaseExecutor(TestExecutor):
         elif self.test_case.status == TestCaseStatus.SKIPPED:
             pconsole.write_line("%s%s|SKIP|" % (self.test_case.full_name, logger_filler))
 
-        after_method_executor = TestFixtureExecutor(self, self.test_case.after_method)
-        after_method_executor.start_and_join()
+        yield TestFixtureExecutor(self, self.test_case.after_method)
         self.test_case.end_time = datetime.now()
         test_listeners.on_test_case_finish(self.test_case)
+        if config.get_option("release_test_instances"):
+            self.test_case.compact()
 
 
 class TestFixtureExecutor(TestExecutor):
@@ -238,37 +447,25 @@ class TestFixtureExecutor(TestExecutor):
 
         failed_setup_fixture = self.test_fixture.context.get_failed_setup_fixture()
         if not failed_setup_fixture:
-            self.run_test_fixture()
+            yield from self.run_test_fixture()
         elif isinstance(self.test_fixture, AfterSuite) and isinstance(failed_setup_fixture, BeforeSuite) and self.test_fixture.always_run:
-            self.run_test_fixture()
+            yield from self.run_test_fixture()
         elif isinstance(self.test_fixture, AfterClass) and isinstance(failed_setup_fixture, BeforeClass) and self.test_fixture.always_run:
-            self.run_test_fixture()
+            yield from self.run_test_fixture()
         elif isinstance(self.test_fixture, AfterGroup) and isinstance(failed_setup_fixture, BeforeGroup) and self.test_fixture.always_run:
-            self.run_test_fixture()
+            yield from self.run_test_fixture()
         elif isinstance(self.test_fixture, AfterMethod) and isinstance(failed_setup_fixture, BeforeMethod) and self.test_fixture.always_run:
-            self.run_test_fixture()
+            yield from self.run_test_fixture()
         else:
             self.skip_test_fixture(failed_setup_fixture)
 
-        # spread before's attributes
+        # keep before's attributes, they are propagated to the test class instances when they are used
         if isinstance(self.test_fixture, BeforeSuite):
-            before_suite_dict = self.test_fixture.test_fixture_ref.__self__.__dict__
-            for test_class in self.test_fixture.test_suite.test_classes:
-                test_class.test_class_ref.__dict__.update(before_suite_dict)
-                for test_group in test_class.test_groups:
-                    test_group.test_class_ref.__dict__.update(before_suite_dict)
-                    for test_case in test_group.test_cases:
-                        test_case.test_case_ref.__self__.__dict__.update(before_suite_dict)
+            self.test_fixture.test_suite.before_suite_state = dict(self.test_fixture.test_fixture_ref.__self__.__dict__)
         elif isinstance(self.test_fixture, BeforeClass):
-            before_class_dict = self.test_fixture.test_fixture_ref.__self__.__dict__
-            for test_group in self.test_fixture.test_class.test_groups:
-                test_group.test_class_ref.__dict__.update(before_class_dict)
-                for test_case in test_group.test_cases:
-                    test_case.test_case_ref.__self__.__dict__.update(before_class_dict)
+            self.test_fixture.test_class.before_class_state = dict(self.test_fixture.test_fixture_ref.__self__.__dict__)
         elif isinstance(self.test_fixture, BeforeGroup):
-            before_group_dict = self.test_fixture.test_fixture_ref.__self__.__dict__
-            for test_case in self.test_fixture.test_group.test_cases:
-                test_case.test_case_ref.__self__.__dict__.update(before_group_dict)
+            self.test_fixture.test_group.before_group_state = dict(self.test_fixture.test_fixture_ref.__self__.__dict__)
 
         self.update_properties({"running_test_fixture": None})
         self.test_fixture.end_time = datetime.now()
@@ -276,24 +473,27 @@ class TestFixtureExecutor(TestExecutor):
     def run_test_fixture(self):
         self.test_fixture.status = TestFixtureStatus.RUNNING
         test_fixture_sub_executor = TestFixtureSubExecutor(self)
-        test_fixture_sub_executor.start()
-        if self.test_fixture.timeout > 0:
-            test_fixture_sub_executor.join(self.test_fixture.timeout)
-            if test_fixture_sub_executor.isAlive():
-                stack_trace = format_thread_stack(test_fixture_sub_executor)
-                try:
-                    kill_thread(test_fixture_sub_executor)
-                except Exception as e:
-                    pconsole_err.write_line(e)
-                from .plogger import preporter
-                self.test_fixture.status = TestFixtureStatus.FAILED
-                self.test_fixture.failure_message = "Timed out executing this test fixture in %s seconds." % self.test_fixture.timeout
-                self.test_fixture.failure_type = "TimeoutException"
-                self.test_fixture.stack_trace = stack_trace
-                preporter.error(
-                    "Failed with following message:\n%s\n%s" % (self.test_fixture.failure_message, self.test_fixture.stack_trace), True)
+        if config.get_option("async_mode") and asyncio.iscoroutinefunction(self.test_fixture.test_fixture_ref):
+            # run the coroutine on the shared event loop, the worker is released while waiting for it
+            yield test_fixture_sub_executor.start_async()
+        elif self.test_fixture.timeout > 0:
+            # run in a separate thread which can be abandoned when timed out, the worker is held until it is done
+            wait([test_fixture_sub_executor.start()])
+
+        if test_fixture_sub_executor.timed_out:
+            self.fail_with_timeout(test_fixture_sub_executor.stack_trace)
         else:
-            test_fixture_sub_executor.join()
+            # the test fixture without timeout is run inline, and the result of other ones is handled here
+            test_fixture_sub_executor.run_inline()
+
+    def fail_with_timeout(self, stack_trace: str):
+        from .plogger import preporter
+        self.test_fixture.status = TestFixtureStatus.FAILED
+        self.test_fixture.failure_message = "Timed out executing this test fixture in %s seconds." % self.test_fixture.timeout
+        self.test_fixture.failure_type = "TimeoutException"
+        self.test_fixture.stack_trace = stack_trace
+        preporter.error(
+            "Failed with following message:\n%s\n%s" % (self.test_fixture.failure_message, self.test_fixture.stack_trace), True)
 
     def skip_test_fixture(self, caused_test_fixture: TestFixture):
         from .plogger import preporter
@@ -306,7 +506,82 @@ class TestFixtureSubExecutor(TestExecutor):
     def __init__(self, test_fixture_executor: TestFixtureExecutor):
         TestExecutor.__init__(self, test_fixture_executor)
         self.test_fixture = test_fixture_executor.test_fixture
-        self.setDaemon(True)
+        # the thread and its outcome of the test fixture with timeout, so it can be abandoned when timed out
+        self.thread = None
+        self.future = None
+        # the asyncio task of the test fixture which is run on the shared event loop
+        self.task = None
+        self.timed_out = False
+        self.stack_trace = ""
+
+    def run_inline(self):
+        token = _current_executor.set(self)
+        try:
+            self._run()
+        finally:
+            _current_executor.reset(token)
+
+    def start(self) -> Future:
+        self.future = Future()
+        self.thread = threading.Thread(target=self.__run_in_thread)
+        self.thread.daemon = True
+        self.thread.start()
+        deadline = self.test_worker_pool.timeout_supervisor.watch(self.test_fixture.timeout, self.__time_out)
+        self.future.add_done_callback(lambda _: self.test_worker_pool.timeout_supervisor.cancel(deadline))
+        return self.future
+
+    def __run_in_thread(self):
+        _current_executor.set(self)
+        try:
+            result = call_function(self.test_fixture.test_fixture_ref, *self.get_parameters())
+        except BaseException as e:
+            # SystemExit is raised here when this thread is interrupted after timed out
+            with self.lock:
+                if not self.timed_out:
+                    self.future.set_exception(e)
+        else:
+            with self.lock:
+                if not self.timed_out:
+                    self.future.set_result(result)
+
+    def __time_out(self):
+        # called by the timeout supervisor
+        with self.lock:
+            if self.future.done():
+                return
+            self.timed_out = True
+            self.stack_trace = format_thread_stack(self.thread)
+        try:
+            interrupt_thread(self.thread)
+        except Exception as e:
+            pconsole_err.write_line(e)
+        self.future.set_result(None)
+
+    def start_async(self) -> Future:
+        return asyncio.run_coroutine_threadsafe(self.__run_async(), self.test_worker_pool.event_loop)
+
+    async def __run_async(self):
+        _current_executor.set(self)
+        self.task = asyncio.ensure_future(self.test_fixture.test_fixture_ref(*self.get_parameters()))
+        await asyncio.wait({self.task}, timeout=self.test_fixture.timeout or None)
+        if not self.task.done():
+            self.timed_out = True
+            self.stack_trace = format_task_stack(self.task)
+            self.task.cancel()
+
+    def get_parameters(self) -> list:
+        if isinstance(self.test_fixture, Test):
+            return self.test_fixture.parameters or []
+        return {1: [], 2: [self.test_fixture.context]}[self.test_fixture.parameters_count]
+
+    def call_test_fixture(self):
+        if self.task is not None:
+            # the test fixture has been run on the shared event loop
+            return self.task.result()
+        if self.future is not None:
+            # the test fixture has been run in a separate thread
+            return self.future.result()
+        return call_function(self.test_fixture.test_fixture_ref, *self.get_parameters())
 
     def _run(self):
         if isinstance(self.test_fixture, Test):
@@ -319,9 +594,8 @@ class TestFixtureSubExecutor(TestExecutor):
             expected_exceptions = self.test_fixture.expected_exceptions
             expected_exceptions_names = str(["%s.%s" % (e.__module__, e.__name__) for e in expected_exceptions.keys()])
             try:
-                params = self.test_fixture.parameters or []
-                call_function(self.test_fixture.test_fixture_ref, *params)
-            except Exception as e:
+                self.call_test_fixture()
+            except (Exception, SystemExit) as e:
                 exception = e.__class__
                 exception_name = "%s.%s" % (exception.__module__, exception.__name__)
                 matched_exceptions = [expected_exception for expected_exception in expected_exceptions.keys() if
@@ -356,9 +630,8 @@ class TestFixtureSubExecutor(TestExecutor):
                 preporter.error("Failed with following message:\n%s" % self.test_fixture.failure_message, True)
         else:
             try:
-                params = self.test_fixture.parameters or []
-                call_function(self.test_fixture.test_fixture_ref, *params)
-            except Exception as e:
+                self.call_test_fixture()
+            except (Exception, SystemExit) as e:
                 self.test_fixture.status = TestFixtureStatus.FAILED
                 self.test_fixture.failure_message = str(e).strip() or "\n".join([str(arg) for arg in e.args])
                 self.test_fixture.failure_type = "%s.%s" % (e.__class__.__module__, e.__class__.__name__)
@@ -369,9 +642,8 @@ class TestFixtureSubExecutor(TestExecutor):
 
     def run_test_configuration(self):
         try:
-            params = {1: [], 2: [self.test_fixture.context]}[self.test_fixture.parameters_count]
-            call_function(self.test_fixture.test_fixture_ref, *params)
-        except Exception as e:
+            self.call_test_fixture()
+        except (Exception, SystemExit) as e:
             self.test_fixture.status = TestFixtureStatus.FAILED
             self.test_fixture.failure_message = str(e).strip() or "\n".join([str(arg) for arg in e.args])
             self.test_fixture.failure_type = "%s.%s" % (e.__class__.__module__, e.__class__.__name__)
@@ -381,5 +653,5 @@ class TestFixtureSubExecutor(TestExecutor):
             self.test_fixture.status = TestFixtureStatus.PASSED
 
 
-def current_executor():
-    return threading.currentThread()
+def current_executor() -> TestExecutor:
+    return _current_executor.get()
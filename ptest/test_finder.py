@@ -2,6 +2,8 @@ import importlib
 import os
 import re
 
+from typing import Set
+
 from .enumeration import PDecoratorType
 from .test_filter import TestFilterGroup
 from .test_suite import TestSuite
@@ -9,21 +11,27 @@ from .util import mock_func
 
 
 class TestFinder:
-    def __init__(self, test_target: str, test_filter_group: TestFilterGroup, target_test_suite: TestSuite):
+    def __init__(self, test_target: str, test_filter_group: TestFilterGroup, target_test_suite: TestSuite,
+                 test_data_names: Set[str] = None):
+        """
+        :param test_data_names: only find the test cases with these data names of the test target (a test method),
+            it is the same as the test targets "test_target#test_data_name" but the data provider is scanned only once.
+        """
         self.test_target = test_target
         self.test_filter_group = test_filter_group
         self.target_test_suite = target_test_suite
         self.found_test_count = 0
         self.repeated_test_count = 0
+        self.found_test_case_stream_count = 0
         # test class / test case name filter
         self.test_class_name = None
         self.test_name = None
-        self.test_data_name = None
+        self.test_data_names = test_data_names
 
     def find_tests(self):
         match_object = re.search(r"^(.*?)#(.*)$", self.test_target)
         if match_object:
-            self.test_data_name = match_object.group(2)
+            self.test_data_names = {match_object.group(2)}
             splitted_test_target = match_object.group(1).split(".")
         else:
             splitted_test_target = self.test_target.split(".")
@@ -44,7 +52,7 @@ class TestFinder:
 
         test_target_len = len(splitted_test_target)
         if module_name_len == test_target_len:
-            if self.test_data_name is not None:
+            if self.test_data_names is not None:
                 raise ImportError("Test target <%s> is invalid.\n"
                                   "It looks like a test case with data provider, "
                                   "but only test module <%s> is provided."
@@ -57,7 +65,7 @@ class TestFinder:
                 # test target is module
                 self.find_tests_in_module(module_ref)
         elif module_name_len == test_target_len - 1:
-            if self.test_data_name is not None:
+            if self.test_data_names is not None:
                 raise ImportError("Test target <%s> is invalid.\n"
                                   "It looks like a test case with data provider, "
                                   "but only test class <%s> is provided."
@@ -114,17 +122,25 @@ class TestFinder:
             test_func = getattr(test_class_cls, class_element)
             if hasattr(test_func, "__pd_type__") and test_func.__pd_type__ == PDecoratorType.Test \
                     and hasattr(test_func, "__enabled__") and test_func.__enabled__:
-                if self.test_name is None:
+                if test_func.__data_provider__ is not None and test_func.__stream_data_provider__:
+                    if (self.test_name is None or self.test_name == test_func.__name__) and self.test_filter_group.filter(test_func):
+                        if self.test_data_names is None:
+                            self.__add_test_case_stream(test_class_cls, test_func, None)
+                        else:
+                            for test_data_name in sorted(self.test_data_names):
+                                self.__add_test_case_stream(test_class_cls, test_func, test_data_name)
+                elif self.test_name is None:
                     for func in unzip_func(test_class_cls, test_func):
                         if self.test_filter_group.filter(func):
                             self.__add_test(test_class_cls, func)
                 else:
-                    if self.test_data_name is not None and test_func.__data_provider__:
+                    if self.test_data_names is not None and test_func.__data_provider__:
                         if self.test_name == test_func.__name__:
+                            func_names = {"%s#%s" % (self.test_name, test_data_name) for test_data_name in self.test_data_names}
                             for func in unzip_func(test_class_cls, test_func):
-                                if "%s#%s" % (self.test_name, self.test_data_name) == func.__name__ and self.test_filter_group.filter(func):
+                                if func.__name__ in func_names and self.test_filter_group.filter(func):
                                     self.__add_test(test_class_cls, func)
-                    elif self.test_data_name is None and self.test_name == test_func.__name__:
+                    elif self.test_data_names is None and self.test_name == test_func.__name__:
                         for func in unzip_func(test_class_cls, test_func):
                             if self.test_filter_group.filter(func):
                                 self.__add_test(test_class_cls, func)
@@ -134,34 +150,18 @@ class TestFinder:
         if not self.target_test_suite.add_test_case(test_class_cls, func):
             self.repeated_test_count += 1
 
+    def __add_test_case_stream(self, test_class_cls, test_func, test_data_name: str):
+        # the tests of streaming data provider are counted when they are created
+        self.found_test_case_stream_count += 1
+        if not self.target_test_suite.add_test_case_stream(test_class_cls, test_func, test_data_name):
+            self.repeated_test_count += 1
+
 
 def unzip_func(test_class_cls, test_func):
     if not test_func.__funcs__:  # zipped
         name_map = {}
         for index, data in enumerate(test_func.__data_provider__):
-            if isinstance(data, (list, tuple)):
-                parameters_count = len(data)
-                parameters = data
-            else:
-                parameters_count = 1
-                parameters = [data]
-            if parameters_count == test_func.__parameters_count__ - 1:
-                mock = mock_func(test_func)
-                mock_name = ("%s#%s" % (test_func.__name__, test_func.__data_name__(index, parameters))).replace(",", "_").replace(" ", "_")
-                if mock_name in name_map:
-                    name_map[mock_name] += 1
-                    mock.__name__ = "%s(%s)" % (mock_name, name_map[mock_name] - 1)
-                else:
-                    name_map[mock_name] = 1
-                    mock.__name__ = mock_name
-                mock.__parameters__ = parameters
-                mock.__data_index__ = index
-                mock.__funcs__ = [mock]
-                mock.__test_class__ = test_class_cls
-                test_func.__funcs__.append(mock)
-            else:
-                raise TypeError("The data provider is trying to pass %s extra arguments but %s.%s() takes %s."
-                                % (parameters_count, test_class_cls.__name__, test_func.__name__, test_func.__parameters_count__ - 1))
+            test_func.__funcs__.append(mock_data_func(test_class_cls, test_func, index, data, name_map))
     elif not test_func.__data_provider__:  # normal
         test_func.__funcs__[0].__test_class__ = test_class_cls
         if test_func.__parameters_count__ != 1:
@@ -169,3 +169,33 @@ def unzip_func(test_class_cls, test_func):
                 "Since data provider is not specified, %s.%s() cannot be declared with %s parameters. Please declare with only 1 parameter (only self)."
                 % (test_class_cls.__name__, test_func.__name__, test_func.__parameters_count__))
     return test_func.__funcs__
+
+
+def mock_data_func(test_class_cls, test_func, index: int, data, name_map: dict):
+    """
+        Mock the test function for one row of its data provider.
+
+    :param name_map: the count of mocked names, it is used to make the names of the mocks unique.
+    """
+    if isinstance(data, (list, tuple)):
+        parameters_count = len(data)
+        parameters = data
+    else:
+        parameters_count = 1
+        parameters = [data]
+    if parameters_count != test_func.__parameters_count__ - 1:
+        raise TypeError("The data provider is trying to pass %s extra arguments but %s.%s() takes %s."
+                        % (parameters_count, test_class_cls.__name__, test_func.__name__, test_func.__parameters_count__ - 1))
+    mock = mock_func(test_func)
+    mock_name = ("%s#%s" % (test_func.__name__, test_func.__data_name__(index, parameters))).replace(",", "_").replace(" ", "_")
+    if mock_name in name_map:
+        name_map[mock_name] += 1
+        mock.__name__ = "%s(%s)" % (mock_name, name_map[mock_name] - 1)
+    else:
+        name_map[mock_name] = 1
+        mock.__name__ = mock_name
+    mock.__parameters__ = parameters
+    mock.__data_index__ = index
+    mock.__funcs__ = [mock]
+    mock.__test_class__ = test_class_cls
+    return mock
@@ -1,12 +1,52 @@
+import threading
 import types
-from functools import cmp_to_key
+from datetime import datetime
+
+from typing import Dict, List, Tuple
 
 from .enumeration import PDecoratorType, TestFixtureStatus, TestClassRunMode, TestCaseStatus
+from .util import mock_func
 
 SECOND_MICROSECOND_CONVERSION_FACTOR = 1000000.0
 
+# test class -> the names of its test fixtures, see get_test_fixture_names()
+_test_fixture_names_cache = {}
+# the lock for updating the status counts, the status of test cases is changed by multiple test executors
+_status_count_lock = threading.Lock()
+
+
+def get_test_fixture_names(test_class_cls) -> Dict[Tuple[PDecoratorType, str], str]:
+    """
+        Get the names of the enabled test fixtures of the test class, the test class is reflected only once.
+
+    :return: (fixture type, group) -> fixture name, the group is None for suite and class level test fixtures.
+    """
+    try:
+        return _test_fixture_names_cache[test_class_cls]
+    except KeyError:
+        pass
+    test_fixture_names = {}
+    for element in dir(test_class_cls):
+        attr = getattr(test_class_cls, element)
+        if hasattr(attr, "__enabled__") and attr.__enabled__ \
+                and hasattr(attr, "__pd_type__") and attr.__pd_type__ != PDecoratorType.Test:
+            if attr.__pd_type__ in (PDecoratorType.BeforeMethod, PDecoratorType.AfterMethod, PDecoratorType.BeforeGroup,
+                                    PDecoratorType.AfterGroup):
+                test_fixture_names[(attr.__pd_type__, attr.__group__)] = element
+            else:
+                test_fixture_names[(attr.__pd_type__, None)] = element
+    _test_fixture_names_cache[test_class_cls] = test_fixture_names
+    return test_fixture_names
+
+
+def _get_test_fixture_ref(test_class_ref, fixture_type: PDecoratorType, group: str = None):
+    test_fixture_name = get_test_fixture_names(test_class_ref.__class__).get((fixture_type, group))
+    return None if test_fixture_name is None else getattr(test_class_ref, test_fixture_name)
+
 
 class StatusCount:
+    __slots__ = ("total", "not_run", "running", "passed", "failed", "skipped")
+
     def __init__(self):
         self.total = 0
         self.not_run = 0
@@ -15,12 +55,22 @@ class StatusCount:
         self.failed = 0
         self.skipped = 0
 
+    def add(self, status: TestFixtureStatus):
+        self.total += 1
+        # the value of status is the name of its count
+        setattr(self, status.value, getattr(self, status.value) + 1)
+
+    def transit(self, from_status: TestFixtureStatus, to_status: TestFixtureStatus):
+        setattr(self, from_status.value, getattr(self, from_status.value) - 1)
+        setattr(self, to_status.value, getattr(self, to_status.value) + 1)
+
 
 class TestContainer:
     def __init__(self):
         self.start_time = None
         self.end_time = None
         self.test_cases = []
+        self.__status_count = StatusCount()
 
     @property
     def elapsed_time(self) -> float:
@@ -29,24 +79,17 @@ class TestContainer:
 
     @property
     def status_count(self) -> StatusCount:
-        count = StatusCount()
-        for test_case in self.test_cases:
-            count.total += 1
-            if test_case.status == TestCaseStatus.NOT_RUN:
-                count.not_run += 1
-            elif test_case.status == TestCaseStatus.RUNNING:
-                count.running += 1
-            elif test_case.status == TestCaseStatus.PASSED:
-                count.passed += 1
-            elif test_case.status == TestCaseStatus.FAILED:
-                count.failed += 1
-            elif test_case.status == TestCaseStatus.SKIPPED:
-                count.skipped += 1
-        return count
+        """
+            The count of test cases by status, it is kept up to date when the status of test cases is changed.
+        """
+        return self.__status_count
 
     @property
     def pass_rate(self) -> float:
         status_count = self.status_count
+        # no test case is created if the streaming data providers are empty
+        if status_count.total == 0:
+            return 0.0
         return float(status_count.passed) * 100 / status_count.total
 
 
@@ -55,28 +98,46 @@ class TestSuite(TestContainer):
         TestContainer.__init__(self)
         self.test_classes = []
         self.test_class_run_groups = []
+        self.test_case_streams = []
+        # full name -> test class, it is maintained alongside test_classes for fast lookup
+        self.__test_class_index = {}
+        # module or package name -> the count of test cases in it by status
+        self.__module_status_counts = {}
+        # the attributes set by @BeforeSuite, they are propagated to the test class instances when they are used
+        self.before_suite_state = {}
         self.name = name
         self.full_name = name
+        self.test_case_timings = {}
+        self.__unknown_elapsed_time = 0
         self.before_suite = BeforeSuite(self, None)
         self.after_suite = AfterSuite(self, None)
 
-    def init(self):
+    def init(self, test_case_timings: Dict[str, float] = None):
+        """
+            Init the test suite after all the test cases are added.
+
+        :param test_case_timings: the elapsed time of test cases in previous runs (test case full name -> seconds),
+            it is used to run the longest test cases first.
+        """
+        self.test_case_timings = test_case_timings or {}
+        # for unknown test case, use the median elapsed time of known test cases
+        known_timings = sorted(self.test_case_timings[test_case.full_name] for test_case in self.test_cases
+                               if test_case.full_name in self.test_case_timings)
+        self.__unknown_elapsed_time = known_timings[len(known_timings) // 2] if known_timings else 0
         self.init_test_fixtures()
         self.init_test_class_run_groups()
         self.sort_test_class_run_groups()
+        self.sort_parallel_test_cases()
 
     def init_test_fixtures(self):
         # reflect the before suite and after suite
         for test_class in self.test_classes:
-            test_class_ref = test_class.test_class_ref.__class__()
-            for element in dir(test_class_ref):
-                attr = getattr(test_class_ref, element)
-                if hasattr(attr, "__enabled__") and attr.__enabled__ \
-                        and hasattr(attr, "__pd_type__"):
-                    if attr.__pd_type__ == PDecoratorType.BeforeSuite:
-                        self.before_suite = BeforeSuite(self, attr)
-                    elif attr.__pd_type__ == PDecoratorType.AfterSuite:
-                        self.after_suite = AfterSuite(self, attr)
+            before_suite_ref = _get_test_fixture_ref(test_class.test_class_ref, PDecoratorType.BeforeSuite)
+            if before_suite_ref is not None:
+                self.before_suite = BeforeSuite(self, before_suite_ref)
+            after_suite_ref = _get_test_fixture_ref(test_class.test_class_ref, PDecoratorType.AfterSuite)
+            if after_suite_ref is not None:
+                self.after_suite = AfterSuite(self, after_suite_ref)
 
     def init_test_class_run_groups(self):
         run_groups = {}
@@ -91,33 +152,42 @@ class TestSuite(TestContainer):
                 run_groups[test_class.run_group] = [test_class]
         self.test_class_run_groups = run_groups.values()
 
+    def estimate_elapsed_time(self, test_case: "TestCase") -> float:
+        try:
+            return self.test_case_timings[test_case.full_name]
+        except KeyError:
+            return self.__unknown_elapsed_time
+
     def sort_test_class_run_groups(self):
         run_groups = []
         # sort the test classes in run group by its run mode
         for run_group in self.test_class_run_groups:
             run_groups.append(sorted(run_group, key=lambda test_class: test_class.run_mode.value, reverse=True))
 
-        # sort the test class run groups by its number of singleline test cases
-        def cmp_run_group(run_group_a, run_group_b):
-            single_line_count_a = single_line_count_b = parallel_count_a = parallel_count_b = 0
-            for test_class in run_group_a:
-                if test_class.run_mode == TestClassRunMode.SingleLine:
-                    single_line_count_a += len(test_class.test_cases)
-                else:
-                    parallel_count_a += len(test_class.test_cases)
-
-            for test_class in run_group_b:
+        # sort the test class run groups by its estimated elapsed time, then by its number of singleline test cases
+        def run_group_key(run_group):
+            elapsed_time = single_line_count = parallel_count = 0
+            for test_class in run_group:
+                elapsed_time += sum(self.estimate_elapsed_time(test_case) for test_case in test_class.test_cases)
                 if test_class.run_mode == TestClassRunMode.SingleLine:
-                    single_line_count_b += len(test_class.test_cases)
+                    single_line_count += len(test_class.test_cases)
                 else:
-                    parallel_count_b += len(test_class.test_cases)
+                    parallel_count += len(test_class.test_cases)
+            return elapsed_time, single_line_count, parallel_count
 
-            if single_line_count_a == single_line_count_b:
-                return parallel_count_a - parallel_count_b
-            else:
-                return single_line_count_a - single_line_count_b
+        self.test_class_run_groups = sorted(run_groups, key=run_group_key, reverse=True)
 
-        self.test_class_run_groups = sorted(run_groups, key=cmp_to_key(cmp_run_group), reverse=True)
+    def sort_parallel_test_cases(self):
+        # the longest test cases and test groups in parallel test classes are started first
+        if not self.test_case_timings:
+            return
+        for test_class in self.test_classes:
+            if test_class.run_mode == TestClassRunMode.Parallel:
+                test_class.test_cases.sort(key=self.estimate_elapsed_time, reverse=True)
+                for test_group in test_class.test_groups:
+                    test_group.test_cases.sort(key=self.estimate_elapsed_time, reverse=True)
+                test_class.test_groups.sort(
+                    key=lambda test_group: sum(self.estimate_elapsed_time(test_case) for test_case in test_group.test_cases), reverse=True)
 
     def get_failed_setup_fixture(self):
         if self.before_suite.status == TestFixtureStatus.FAILED:
@@ -125,24 +195,44 @@ class TestSuite(TestContainer):
         return None
 
     def get_test_class(self, full_name: str):
-        for test_class in self.test_classes:
-            if test_class.full_name == full_name:
-                return test_class
-        return None
-
-    def add_test_case(self, test_class_cls, test_case_func):
+        return self.__test_class_index.get(full_name)
+
+    def get_module_status_count(self, full_name: str) -> StatusCount:
+        """
+            Get the count of test cases in the module or package by status, it is kept up to date like status_count.
+        """
+        with _status_count_lock:
+            return self.__module_status_counts.get(full_name) or StatusCount()
+
+    def get_module_status_counts(self, module_full_name: str) -> List[StatusCount]:
+        """
+            Get the status counts of the module and its parent packages, they are created if not exist.
+        """
+        splitted_full_name = module_full_name.split(".")
+        with _status_count_lock:
+            return [self.__module_status_counts.setdefault(".".join(splitted_full_name[:i + 1]), StatusCount())
+                    for i in range(len(splitted_full_name))]
+
+    def add_test_class(self, test_class: "TestClass"):
+        self.test_classes.append(test_class)
+        self.__test_class_index[test_class.full_name] = test_class
+
+    def __get_test_group(self, test_class_cls, group: str) -> "TestGroup":
         # for the @TestClass can be inherited, so set full name here
         test_class_cls.__full_name__ = "%s.%s" % (test_class_cls.__module__, test_class_cls.__name__)
         test_class = self.get_test_class(test_class_cls.__full_name__)
         if test_class is None:
             test_class = TestClass(self, test_class_cls())
-            self.test_classes.append(test_class)
+            self.add_test_class(test_class)
 
-        test_group = test_class.get_test_group(test_case_func.__group__)
+        test_group = test_class.get_test_group(group)
         if test_group is None:
-            test_group = TestGroup(test_class, test_case_func.__group__, test_class_cls())
-            test_class.test_groups.append(test_group)
+            test_group = TestGroup(test_class, group, test_class_cls())
+            test_class.add_test_group(test_group)
+        return test_group
 
+    def add_test_case(self, test_class_cls, test_case_func):
+        test_group = self.__get_test_group(test_class_cls, test_case_func.__group__)
         test_case = test_group.get_test_case(test_case_func.__name__)
         if test_case is None:
             if hasattr(test_class_cls, test_case_func.__name__):  # normal
@@ -152,12 +242,23 @@ class TestSuite(TestContainer):
                 mock_method = types.MethodType(test_case_func, test_class_ref)
                 setattr(test_class_ref, test_case_func.__name__, mock_method)
                 test_case = TestCase(test_group, mock_method)
-            test_group.test_cases.append(test_case)
-            test_class.test_cases.append(test_case)
-            self.test_cases.append(test_case)
+            test_group.add_test_case(test_case)
             return True
         return False
 
+    def add_test_case_stream(self, test_class_cls, test_func, test_data_name: str = None):
+        """
+            Add the test of streaming data provider, its test cases are created while running.
+
+        :param test_data_name: only run the test case with this data name, None means all.
+        """
+        test_group = self.__get_test_group(test_class_cls, test_func.__group__)
+        test_case_stream = test_group.get_test_case_stream(test_func.__name__)
+        if test_case_stream is None:
+            test_group.add_test_case_stream(TestCaseStream(test_group, test_class_cls, test_func, test_data_name))
+            return True
+        return test_case_stream.add_test_data_name(test_data_name)
+
 
 class TestClass(TestContainer):
     def __init__(self, test_suite: TestSuite, test_class_ref):
@@ -165,24 +266,21 @@ class TestClass(TestContainer):
         self.test_suite = test_suite
         self.test_class_ref = test_class_ref
         self.test_groups = []
+        self.test_case_streams = []
+        # name -> test group, it is maintained alongside test_groups for fast lookup
+        self.__test_group_index = {}
         self.name = test_class_ref.__class__.__name__
         self.full_name = test_class_ref.__full_name__
+        self.module_name = test_class_ref.__class__.__module__
+        # the attributes set by @BeforeClass, they are propagated to the test class instances when they are used
+        self.before_class_state = {}
         self.run_mode = test_class_ref.__run_mode__
         self.run_group = test_class_ref.__run_group__
         self.description = test_class_ref.__description__
         self.custom_args = test_class_ref.__custom_args__
 
-        self.before_class = BeforeClass(self, None)
-        self.after_class = AfterClass(self, None)
-        # reflect the before class and after class
-        for element in dir(test_class_ref):
-            attr = getattr(test_class_ref, element)
-            if hasattr(attr, "__enabled__") and attr.__enabled__ \
-                    and hasattr(attr, "__pd_type__"):
-                if attr.__pd_type__ == PDecoratorType.BeforeClass:
-                    self.before_class = BeforeClass(self, attr)
-                elif attr.__pd_type__ == PDecoratorType.AfterClass:
-                    self.after_class = AfterClass(self, attr)
+        self.before_class = BeforeClass(self, _get_test_fixture_ref(test_class_ref, PDecoratorType.BeforeClass))
+        self.after_class = AfterClass(self, _get_test_fixture_ref(test_class_ref, PDecoratorType.AfterClass))
 
     def get_failed_setup_fixture(self) -> "TestFixture":
         setup_fixture = self.test_suite.get_failed_setup_fixture()
@@ -192,11 +290,20 @@ class TestClass(TestContainer):
             return self.before_class
         return None
 
+    def compact(self):
+        """
+            Release the test class instance of this finished test class, only its result is kept.
+        """
+        self.test_class_ref = None
+        self.before_class.compact()
+        self.after_class.compact()
+
     def get_test_group(self, name: str) -> "TestGroup":
-        for test_group in self.test_groups:
-            if test_group.name == name:
-                return test_group
-        return None
+        return self.__test_group_index.get(name)
+
+    def add_test_group(self, test_group: "TestGroup"):
+        self.test_groups.append(test_group)
+        self.__test_group_index[test_group.name] = test_group
 
     @property
     def is_group_feature_used(self) -> bool:
@@ -211,21 +318,17 @@ class TestGroup(TestContainer):
         self.test_suite = self.test_class.test_suite
         self.test_class_ref = test_class_ref
         self.test_cases = []
+        self.test_case_streams = []
+        # name -> test case / test case stream, they are maintained alongside the lists for fast lookup
+        self.__test_case_index = {}
+        self.__test_case_stream_index = {}
         self.name = name
         self.full_name = "%s<%s>" % (test_class.full_name, name)
+        # the attributes set by @BeforeGroup, they are propagated to the test class instances when they are used
+        self.before_group_state = {}
 
-        self.before_group = BeforeGroup(self, None)
-        self.after_group = AfterGroup(self, None)
-        # reflect the before group and after group
-        for element in dir(test_class_ref):
-            attr = getattr(test_class_ref, element)
-            if hasattr(attr, "__enabled__") and attr.__enabled__ \
-                    and hasattr(attr, "__group__") and attr.__group__ == self.name \
-                    and hasattr(attr, "__pd_type__"):
-                if attr.__pd_type__ == PDecoratorType.BeforeGroup:
-                    self.before_group = BeforeGroup(self, attr)
-                elif attr.__pd_type__ == PDecoratorType.AfterGroup:
-                    self.after_group = AfterGroup(self, attr)
+        self.before_group = BeforeGroup(self, _get_test_fixture_ref(test_class_ref, PDecoratorType.BeforeGroup, self.name))
+        self.after_group = AfterGroup(self, _get_test_fixture_ref(test_class_ref, PDecoratorType.AfterGroup, self.name))
 
     def get_failed_setup_fixture(self) -> "TestFixture":
         setup_fixture = self.test_class.get_failed_setup_fixture()
@@ -235,47 +338,176 @@ class TestGroup(TestContainer):
             return self.before_group
         return None
 
+    def compact(self):
+        """
+            Release the test class instance of this finished test group, only its result is kept.
+        """
+        self.test_class_ref = None
+        self.before_group.compact()
+        self.after_group.compact()
+
     def get_test_case(self, name: str) -> "TestCase":
-        for test_case in self.test_cases:
-            if test_case.name == name:
-                return test_case
-        return None
+        return self.__test_case_index.get(name)
+
+    def get_test_case_stream(self, name: str) -> "TestCaseStream":
+        return self.__test_case_stream_index.get(name)
+
+    def add_test_case(self, test_case: "TestCase"):
+        self.test_cases.append(test_case)
+        self.__test_case_index[test_case.name] = test_case
+        self.test_class.test_cases.append(test_case)
+        self.test_suite.test_cases.append(test_case)
+        test_case.test.add_status_counts([self.status_count, self.test_class.status_count, self.test_suite.status_count]
+                                         + self.test_suite.get_module_status_counts(self.test_class.module_name))
+
+    def add_test_case_stream(self, test_case_stream: "TestCaseStream"):
+        self.test_case_streams.append(test_case_stream)
+        self.__test_case_stream_index[test_case_stream.name] = test_case_stream
+        self.test_class.test_case_streams.append(test_case_stream)
+        self.test_suite.test_case_streams.append(test_case_stream)
+
+
+class TestCaseStream:
+    """
+        The test of streaming data provider, its test cases are created just in time while running.
+    """
+
+    def __init__(self, test_group: TestGroup, test_class_cls, test_func, test_data_name: str = None):
+        self.test_group = test_group
+        self.test_class = test_group.test_class
+        self.test_suite = test_group.test_suite
+        self.test_class_cls = test_class_cls
+        self.test_func = test_func
+        self.name = test_func.__name__
+        self.full_name = "%s.%s" % (self.test_class.full_name, self.name)
+        # the names of the test cases to be run, None means all
+        self.test_case_names = None if test_data_name is None else {"%s#%s" % (self.name, test_data_name)}
+        self.__lock = threading.Lock()
+        self.__data_iterator = None
+        self.__data_index = 0
+        self.__name_map = {}
+
+    def add_test_data_name(self, test_data_name: str) -> bool:
+        """
+        :return: False if the test case with this data name is already included.
+        """
+        if self.test_case_names is None:
+            return False
+        if test_data_name is None:
+            self.test_case_names = None
+            return True
+        test_case_name = "%s#%s" % (self.name, test_data_name)
+        if test_case_name in self.test_case_names:
+            return False
+        self.test_case_names.add(test_case_name)
+        return True
+
+    @property
+    def test_targets(self) -> list:
+        """
+            The test targets which can be found by TestFinder.
+        """
+        if self.test_case_names is None:
+            return [self.full_name]
+        return ["%s.%s" % (self.test_class.full_name, test_case_name) for test_case_name in sorted(self.test_case_names)]
+
+    def next_test_case(self) -> "TestCase":
+        """
+            Create the test case for next row of the data provider.
+
+        :return: the created test case, or None if the data provider is exhausted.
+        """
+        from .test_finder import mock_data_func
+        with self.__lock:
+            if self.__data_iterator is None:
+                self.__data_iterator = iter(self.test_func.__data_provider__)
+            for data in self.__data_iterator:
+                self.__data_index += 1
+                mock = mock_data_func(self.test_class_cls, self.test_func, self.__data_index - 1, data, self.__name_map)
+                if self.test_case_names is None or mock.__name__ in self.test_case_names:
+                    return self.__add_test_case(mock)
+            return None
+
+    def add_finished_test_case(self, name: str, data_index: int) -> "TestCase":
+        """
+            Add the test case which was created and run in another process, its result should be merged into it.
+        """
+        mock = mock_func(self.test_func)
+        mock.__name__ = name
+        mock.__data_index__ = data_index
+        mock.__funcs__ = [mock]
+        mock.__test_class__ = self.test_class_cls
+        with self.__lock:
+            test_case = self.__add_test_case(mock)
+        test_case.compact()
+        return test_case
+
+    def add_data_provider_error_test_case(self) -> "TestCase":
+        """
+            Add the test case standing for the error of reading the data provider, it should be failed instead of run.
+        """
+        with self.__lock:
+            data_index = self.__data_index
+        return self.add_finished_test_case("%s#DataProviderError" % self.name, data_index)
+
+    def __add_test_case(self, test_case_func) -> "TestCase":
+        test_class_ref = self.test_class_cls()
+        mock_method = types.MethodType(test_case_func, test_class_ref)
+        setattr(test_class_ref, test_case_func.__name__, mock_method)
+        test_case = TestCase(self.test_group, mock_method)
+        self.test_group.add_test_case(test_case)
+        return test_case
+
+
+class _TestRecord:
+    """
+        The base of test case and test fixture, there are lots of them in a large test suite,
+        so their attributes are stored in slots and the start time and end time are stored as float timestamps.
+    """
+    __slots__ = ("_start_timestamp", "_end_timestamp")
+
+    def __init__(self):
+        self._start_timestamp = None
+        self._end_timestamp = None
+
+    @property
+    def start_time(self) -> datetime:
+        return None if self._start_timestamp is None else datetime.fromtimestamp(self._start_timestamp)
+
+    @start_time.setter
+    def start_time(self, start_time: datetime):
+        self._start_timestamp = None if start_time is None else start_time.timestamp()
+
+    @property
+    def end_time(self) -> datetime:
+        return None if self._end_timestamp is None else datetime.fromtimestamp(self._end_timestamp)
+
+    @end_time.setter
+    def end_time(self, end_time: datetime):
+        self._end_timestamp = None if end_time is None else end_time.timestamp()
+
+    @property
+    def elapsed_time(self) -> float:
+        return round(self._end_timestamp - self._start_timestamp, 6)
 
 
-class TestCase:
+class TestCase(_TestRecord):
+    __slots__ = ("test_group", "test_class", "test_suite", "test_case_ref", "name", "full_name", "test", "before_method",
+                 "after_method")
+
     def __init__(self, test_group: TestGroup, test_case_ref):
+        _TestRecord.__init__(self)
         self.test_group = test_group
         self.test_class = self.test_group.test_class
         self.test_suite = self.test_class.test_suite
         self.test_case_ref = test_case_ref
         self.name = test_case_ref.__name__
         self.full_name = "%s.%s" % (self.test_class.full_name, self.name)
-        self.start_time = None
-        self.end_time = None
 
         self.test = Test(self, test_case_ref)
 
-        self.tags = self.test.tags
-        self.expected_exceptions = self.test.expected_exceptions
-        self.parameters = self.test.parameters
-        self.data_index = self.test.data_index
-        self.group = self.test.group
-        self.description = self.test.description
-        self.custom_args = self.test.custom_args
-        self.location = self.test.location
-
-        self.before_method = BeforeMethod(self, None)
-        self.after_method = AfterMethod(self, None)
-        # reflect the before method and after method
-        for element in dir(test_case_ref.__self__):
-            attr = getattr(test_case_ref.__self__, element)
-            if hasattr(attr, "__enabled__") and attr.__enabled__ \
-                    and hasattr(attr, "__group__") and attr.__group__ == self.group \
-                    and hasattr(attr, "__pd_type__"):
-                if attr.__pd_type__ == PDecoratorType.BeforeMethod:
-                    self.before_method = BeforeMethod(self, attr)
-                elif attr.__pd_type__ == PDecoratorType.AfterMethod:
-                    self.after_method = AfterMethod(self, attr)
+        self.before_method = BeforeMethod(self, _get_test_fixture_ref(test_case_ref.__self__, PDecoratorType.BeforeMethod, self.group))
+        self.after_method = AfterMethod(self, _get_test_fixture_ref(test_case_ref.__self__, PDecoratorType.AfterMethod, self.group))
 
     def get_failed_setup_fixture(self) -> "TestFixture":
         setup_fixture = self.test_group.get_failed_setup_fixture()
@@ -285,6 +517,53 @@ class TestCase:
             return self.before_method
         return None
 
+    def compact(self):
+        """
+            Release the test class instance and the test data of this finished test case, only its result is kept.
+        """
+        if self.test_case_ref is None:
+            return
+        # break the reference cycle between the test class instance and its mocked test method, so it is freed immediately
+        instance_dict = getattr(self.test_case_ref.__self__, "__dict__", {})
+        if instance_dict.get(self.name) is self.test_case_ref:
+            del instance_dict[self.name]
+        self.test_case_ref = None
+        self.before_method.compact()
+        self.test.compact()
+        self.after_method.compact()
+
+    @property
+    def tags(self) -> list:
+        return self.test.tags
+
+    @property
+    def expected_exceptions(self) -> dict:
+        return self.test.expected_exceptions
+
+    @property
+    def parameters(self) -> list:
+        return self.test.parameters
+
+    @property
+    def data_index(self) -> int:
+        return self.test.data_index
+
+    @property
+    def group(self) -> str:
+        return self.test.group
+
+    @property
+    def description(self) -> str:
+        return self.test.description
+
+    @property
+    def custom_args(self) -> dict:
+        return self.test.custom_args
+
+    @property
+    def location(self) -> str:
+        return self.test.location
+
     @property
     def failure_message(self) -> str:
         return self.test.failure_message
@@ -303,23 +582,15 @@ class TestCase:
 
     @property
     def status(self) -> TestCaseStatus:
-        status_map = {
-            TestFixtureStatus.NOT_RUN: TestCaseStatus.NOT_RUN,
-            TestFixtureStatus.RUNNING: TestCaseStatus.RUNNING,
-            TestFixtureStatus.PASSED: TestCaseStatus.PASSED,
-            TestFixtureStatus.SKIPPED: TestCaseStatus.SKIPPED,
-            TestFixtureStatus.FAILED: TestCaseStatus.FAILED,
-        }
-        return status_map[self.test.status]
+        return _TEST_CASE_STATUS_MAP[self.test.status]
 
-    @property
-    def elapsed_time(self) -> float:
-        time_delta = self.end_time - self.start_time
-        return time_delta.seconds + time_delta.microseconds / SECOND_MICROSECOND_CONVERSION_FACTOR
 
+class TestFixture(_TestRecord):
+    __slots__ = ("context", "fixture_type", "is_empty", "status", "test_fixture_ref", "name", "failure_message", "failure_type",
+                 "stack_trace", "skip_message", "logs", "description", "timeout", "custom_args", "location", "parameters_count")
 
-class TestFixture:
     def __init__(self, context, test_fixture_ref, fixture_type: PDecoratorType):
+        _TestRecord.__init__(self)
         self.context = context
         self.fixture_type = fixture_type
         self.is_empty = False
@@ -329,13 +600,10 @@ class TestFixture:
             return
         self.test_fixture_ref = test_fixture_ref
         self.name = test_fixture_ref.__name__
-        self.full_name = ""
         self.failure_message = ""
         self.failure_type = ""
         self.stack_trace = ""
         self.skip_message = ""
-        self.start_time = None
-        self.end_time = None
         self.logs = []
         self.description = test_fixture_ref.__description__
         self.timeout = test_fixture_ref.__timeout__
@@ -344,40 +612,49 @@ class TestFixture:
         self.parameters_count = test_fixture_ref.__parameters_count__
 
     @property
-    def elapsed_time(self) -> float:
-        time_delta = self.end_time - self.start_time
-        return time_delta.seconds + time_delta.microseconds / SECOND_MICROSECOND_CONVERSION_FACTOR
+    def full_name(self) -> str:
+        return "%s@%s" % (self.context.full_name, self.fixture_type.value)
+
+    def add_log(self, log: dict):
+        self.logs.append(log)
+
+    def compact(self):
+        if not self.is_empty:
+            self.test_fixture_ref = None
 
 
 class BeforeSuite(TestFixture):
+    __slots__ = ("test_suite",)
+
     def __init__(self, test_suite: TestSuite, test_fixture_ref):
         TestFixture.__init__(self, test_suite, test_fixture_ref, PDecoratorType.BeforeSuite)
         self.test_suite = self.context
-        if not self.is_empty:
-            self.full_name = "%s@%s" % (test_suite.name, self.fixture_type.value)
 
 
 class BeforeClass(TestFixture):
+    __slots__ = ("test_class", "test_suite")
+
     def __init__(self, test_class: TestClass, test_fixture_ref):
         TestFixture.__init__(self, test_class, test_fixture_ref, PDecoratorType.BeforeClass)
         self.test_class = self.context
         self.test_suite = self.test_class.test_suite
-        if not self.is_empty:
-            self.full_name = "%s@%s" % (test_class.full_name, self.fixture_type.value)
 
 
 class BeforeGroup(TestFixture):
+    __slots__ = ("test_group", "test_class", "test_suite", "group")
+
     def __init__(self, test_group: TestGroup, test_fixture_ref):
         TestFixture.__init__(self, test_group, test_fixture_ref, PDecoratorType.BeforeGroup)
         self.test_group = self.context
         self.test_class = self.test_group.test_class
         self.test_suite = self.test_group.test_suite
         if not self.is_empty:
-            self.full_name = "%s@%s" % (test_group.full_name, self.fixture_type.value)
             self.group = test_fixture_ref.__group__
 
 
 class BeforeMethod(TestFixture):
+    __slots__ = ("test_case", "test_group", "test_class", "test_suite", "group")
+
     def __init__(self, test_case: TestCase, test_fixture_ref):
         TestFixture.__init__(self, test_case, test_fixture_ref, PDecoratorType.BeforeMethod)
         self.test_case = self.context
@@ -385,14 +662,18 @@ class BeforeMethod(TestFixture):
         self.test_class = self.test_case.test_class
         self.test_suite = self.test_case.test_suite
         if not self.is_empty:
-            self.full_name = "%s@%s" % (test_case.full_name, self.fixture_type.value)
             self.group = test_fixture_ref.__group__
 
 
 class Test(TestFixture):
+    __slots__ = ("test_case", "test_group", "test_class", "test_suite", "tags", "expected_exceptions", "parameters", "data_index",
+                 "group", "_status", "status_counts")
+
     def __init__(self, test_case: TestCase, test_fixture_ref):
+        self._status = TestFixtureStatus.NOT_RUN
+        # the status counts of the containers of this test
+        self.status_counts = []
         TestFixture.__init__(self, test_case, test_fixture_ref, PDecoratorType.Test)
-        self.full_name = "%s@%s" % (test_case.full_name, self.fixture_type.value)
         self.test_case = self.context
         self.test_group = self.test_case.test_group
         self.test_class = self.test_case.test_class
@@ -403,8 +684,33 @@ class Test(TestFixture):
         self.data_index = test_fixture_ref.__data_index__
         self.group = test_fixture_ref.__group__
 
+    @property
+    def status(self) -> TestFixtureStatus:
+        return self._status
+
+    @status.setter
+    def status(self, status: TestFixtureStatus):
+        with _status_count_lock:
+            previous_status = self._status
+            self._status = status
+            if previous_status != status:
+                for status_count in self.status_counts:
+                    status_count.transit(previous_status, status)
+
+    def add_status_counts(self, status_counts: list):
+        with _status_count_lock:
+            for status_count in status_counts:
+                status_count.add(self._status)
+            self.status_counts.extend(status_counts)
+
+    def compact(self):
+        TestFixture.compact(self)
+        self.parameters = None
+
 
 class AfterMethod(TestFixture):
+    __slots__ = ("test_case", "test_group", "test_class", "test_suite", "always_run", "group")
+
     def __init__(self, test_case: TestCase, test_fixture_ref):
         TestFixture.__init__(self, test_case, test_fixture_ref, PDecoratorType.AfterMethod)
         self.test_case = self.context
@@ -412,40 +718,50 @@ class AfterMethod(TestFixture):
         self.test_class = self.test_case.test_class
         self.test_suite = self.test_case.test_suite
         if not self.is_empty:
-            self.full_name = "%s@%s" % (test_case.full_name, self.fixture_type.value)
             self.always_run = test_fixture_ref.__always_run__
             self.group = test_fixture_ref.__group__
 
 
 class AfterGroup(TestFixture):
+    __slots__ = ("test_group", "test_class", "test_suite", "always_run", "group")
+
     def __init__(self, test_group: TestGroup, test_fixture_ref):
         TestFixture.__init__(self, test_group, test_fixture_ref, PDecoratorType.AfterGroup)
         self.test_group = self.context
         self.test_class = self.test_group.test_class
         self.test_suite = self.test_group.test_suite
         if not self.is_empty:
-            self.full_name = "%s@%s" % (test_group.full_name, self.fixture_type.value)
             self.always_run = test_fixture_ref.__always_run__
             self.group = test_fixture_ref.__group__
 
 
 class AfterClass(TestFixture):
+    __slots__ = ("test_class", "test_suite", "always_run")
+
     def __init__(self, test_class: TestClass, test_fixture_ref):
         TestFixture.__init__(self, test_class, test_fixture_ref, PDecoratorType.AfterClass)
         self.test_class = self.context
         self.test_suite = self.test_class.test_suite
         if not self.is_empty:
-            self.full_name = "%s@%s" % (test_class.full_name, self.fixture_type.value)
             self.always_run = test_fixture_ref.__always_run__
 
 
 class AfterSuite(TestFixture):
+    __slots__ = ("test_suite", "always_run")
+
     def __init__(self, test_suite: TestSuite, test_fixture_ref):
         TestFixture.__init__(self, test_suite, test_fixture_ref, PDecoratorType.AfterSuite)
         self.test_suite = self.context
         if not self.is_empty:
-            self.full_name = "%s@%s" % (test_suite.name, self.fixture_type.value)
             self.always_run = test_fixture_ref.__always_run__
 
 
+_TEST_CASE_STATUS_MAP = {
+    TestFixtureStatus.NOT_RUN: TestCaseStatus.NOT_RUN,
+    TestFixtureStatus.RUNNING: TestCaseStatus.RUNNING,
+    TestFixtureStatus.PASSED: TestCaseStatus.PASSED,
+    TestFixtureStatus.SKIPPED: TestCaseStatus.SKIPPED,
+    TestFixtureStatus.FAILED: TestCaseStatus.FAILED,
+}
+
 default_test_suite = TestSuite("DefaultSuite")
@@ -0,0 +1,47 @@
+import json
+import os
+import uuid
+
+from typing import Dict
+
+from .enumeration import TestCaseStatus
+from .plogger import pconsole_err
+from .test_suite import TestSuite
+from .util import make_dirs
+
+
+def load_test_case_timings(file_path: str) -> Dict[str, float]:
+    """
+        Load the elapsed time of test cases (test case full name -> seconds) saved by previous runs.
+        If the file doesn't exist or is broken, empty dict will be returned.
+    """
+    if not os.path.isfile(file_path):
+        return {}
+    try:
+        with open(file_path, encoding="utf-8") as f:
+            test_case_timings = json.load(f)
+    except (OSError, ValueError) as e:
+        pconsole_err.write_line("Failed to load the test timings file <%s>, it is ignored: %s" % (file_path, e))
+        return {}
+    if not isinstance(test_case_timings, dict):
+        pconsole_err.write_line("The test timings file <%s> is not a json object, it is ignored." % file_path)
+        return {}
+    return test_case_timings
+
+
+def save_test_case_timings(file_path: str, test_suite: TestSuite):
+    """
+        Save the elapsed time of the run test cases, the timings of test cases not in this run are kept.
+    """
+    test_case_timings = load_test_case_timings(file_path)
+    for test_case in test_suite.test_cases:
+        # the skipped test cases are not really run
+        if test_case.status in (TestCaseStatus.PASSED, TestCaseStatus.FAILED):
+            test_case_timings[test_case.full_name] = round(test_case.elapsed_time, 3)
+
+    make_dirs(os.path.dirname(file_path))
+    # write to a temp file and replace the old one at once, so a broken run does not leave a truncated file
+    temp_file_path = "%s.%s.tmp" % (file_path, uuid.uuid4().hex)
+    with open(temp_file_path, mode="w", encoding="utf-8") as f:
+        json.dump(test_case_timings, f, indent=1, sort_keys=True)
+    os.replace(temp_file_path, file_path)
@@ -41,7 +41,11 @@ def call_function(func, *args, **kwargs):
     if asyncio.iscoroutinefunction(func):
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
-        return loop.run_until_complete(func.__call__(*args, **kwargs))
+        try:
+            return loop.run_until_complete(func.__call__(*args, **kwargs))
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
     return func.__call__(*args, **kwargs)
 
 
@@ -51,7 +55,26 @@ def kill_thread(thread: Thread):
 
     :param thread: a threading.Thread instance
     """
-    exc = ctypes.py_object(SystemExit)
+    interrupt_thread(thread)
+
+    start_time = time.time()
+    while (time.time() - start_time) <= 30:
+        if not thread.is_alive():
+            return
+        time.sleep(1)
+
+    raise SystemError("Timed out waiting for thread <%s> to be killed." % thread)
+
+
+def interrupt_thread(thread: Thread, exception: type = SystemExit):
+    """
+        Raise the exception asynchronously in a python thread from another thread, it does not wait for the thread to exit.
+        Note that the exception is raised only when the thread executes python code again.
+
+    :param thread: a threading.Thread instance
+    :param exception: the exception class to be raised
+    """
+    exc = ctypes.py_object(exception)
     res = ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_long(thread.ident), exc)
     if res == 0:
         raise ValueError("nonexistent thread id")
@@ -61,14 +84,6 @@ def kill_thread(thread: Thread):
         ctypes.pythonapi.PyThreadState_SetAsyncExc(thread.ident, None)
         raise SystemError("PyThreadState_SetAsyncExc failed")
 
-    start_time = time.time()
-    while (time.time() - start_time) <= 30:
-        if not thread.isAlive():
-            return
-        time.sleep(1)
-
-    raise SystemError("Timed out waiting for thread <%s> to be killed." % thread)
-
 
 def format_thread_stack(thread: Thread):
     stack_code = ["Stack Trace:"]
@@ -80,6 +95,25 @@ def format_thread_stack(thread: Thread):
     return "\n".join(stack_code)
 
 
+def format_task_stack(task: asyncio.Task):
+    # walk through the awaited coroutines, task.get_stack() only returns the outermost frame of suspended coroutine
+    frames = []
+    # Task.get_coro() is added in python 3.8
+    coroutine = task.get_coro() if hasattr(task, "get_coro") else task._coro
+    while coroutine is not None:
+        frame = getattr(coroutine, "cr_frame", None) or getattr(coroutine, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append((frame, frame.f_lineno))
+        coroutine = getattr(coroutine, "cr_await", None) or getattr(coroutine, "gi_yieldfrom", None)
+    stack_code = ["Stack Trace:"]
+    for file_name, line_no, name, line in traceback.StackSummary.extract(frames):
+        stack_code.append("  File: \"%s\", line %d, in %s" % (file_name, line_no, name))
+        if line:
+            stack_code.append("    %s" % (line.strip()))
+    return "\n".join(stack_code)
+
+
 def escape_html(obj: Any):
     if isinstance(obj, dict):
         return {key: escape_html(value) for key, value in obj.items()}